@@ -1,19 +1,25 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from routes.pose import router as pose_router
+import time
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from routes.pose import router as pose_router, schedulers as inference_schedulers, frame_archiver
 from routes.auth import router as auth_router
-from fastapi.responses import FileResponse, JSONResponse
+from routes.health import router as health_router, startup_timer
+from routes.video import router as video_router, video_scheduler
+from services.inference_executor import INFERENCE_EXECUTOR
+from services.metrics import MetricsMiddleware, metrics
+from services.model_registry import DEFAULT_MODEL, registry
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import os
-import uuid
-import numpy as np
-import cv2
-from ultralytics import YOLO
 import logging
 from database import engine
 from models.user import Base
 
-# Create tables in the database
-Base.metadata.create_all(bind=engine)
+# Heavy packages (torch, ultralytics) are imported by the startup hook when
+# the model is loaded, not here
+startup_timer.record("imports", time.perf_counter() - _import_start)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -26,9 +32,67 @@ app = FastAPI()
 async def root():
     return {"message": "Welcome to the YOLOv11 Pose Detection API!"}
 
+# Prometheus scrape endpoint: request counts and latency, per-stage frame
+# timings, detected classes and inference queue depth
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def prepare_inference_workers():
+    """Load and warm every inference worker's model, so no live request pays for it"""
+    schedulers = [(name, s, True) for name, s in inference_schedulers.items()]
+    schedulers.append((DEFAULT_MODEL, video_scheduler, False))
+    for name, inference_scheduler, primary in schedulers:
+        if INFERENCE_EXECUTOR != "process" and not registry.loaded(name):
+            # Replicas of a model that failed to load would fail the same way
+            continue
+        started = time.perf_counter()
+        try:
+            ready = await run_in_threadpool(inference_scheduler.prepare)
+        except Exception as e:
+            logger.error(f"Could not start inference workers for model '{name}': {e}")
+            ready = 0
+        if INFERENCE_EXECUTOR == "process" and primary:
+            registry.mark_workers_ready(name, ready, time.perf_counter() - started)
+
+# Create tables, then load and warm up models before serving traffic
+@app.on_event("startup")
+async def startup():
+    with startup_timer.stage("database"):
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    # With process workers each worker loads its own replica; a model in this
+    # process would never run
+    if INFERENCE_EXECUTOR != "process":
+        with startup_timer.stage("model_load"):
+            await run_in_threadpool(registry.load_all, warmup=False)
+        with startup_timer.stage("warmup"):
+            for name in registry.health():
+                await run_in_threadpool(registry.warmup, name)
+    with startup_timer.stage("workers"):
+        await prepare_inference_workers()
+
+    timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in startup_timer.durations.items())
+    logger.info(f"Startup completed in {sum(startup_timer.durations.values()):.2f}s ({timings})")
+
+# Stop the inference scheduler workers on shutdown
+@app.on_event("shutdown")
+async def shutdown_inference_scheduler():
+    for inference_scheduler in (*inference_schedulers.values(), video_scheduler):
+        await inference_scheduler.close()
+
+# Write out frames still queued for the archive
+@app.on_event("shutdown")
+async def shutdown_frame_archiver():
+    await run_in_threadpool(frame_archiver.close)
+
 # Register routers
 app.include_router(pose_router)
+app.include_router(video_router)
 app.include_router(auth_router)
+app.include_router(health_router)
+
+# Count and time every HTTP request by route template
+app.add_middleware(MetricsMiddleware, registry=metrics)
 
 # Allow CORS for local frontend
 app.add_middleware(
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Load-test the API in-process and report latency percentiles, throughput and per-stage timings as JSON
+
+The app runs on a local uvicorn server with SQLite instead of MySQL and, by
+default, a stub model with a fixed inference delay so API overhead is measured
+on its own. Pass --model to benchmark a real weights file instead. Compare a
+run against an earlier one with --compare to catch regressions between commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+SCENARIOS = ("predict", "detect", "ws_predict", "login", "me")
+
+CLASS_NAMES = {i: str(i) for i in range(10)}
+CLASS_NAMES.update({10: "tambah", 11: "kurang", 12: "kali", 13: "bagi", 14: "Start", 15: "Undefined"})
+
+
+class StubPoseModel:
+    """Stands in for YOLOv11 with a fixed delay per forward pass"""
+
+    def __init__(self, delay_ms=5.0, seed=0):
+        self.names = CLASS_NAMES
+        self.delay = delay_ms / 1000.0
+        self.rng = np.random.default_rng(seed)
+
+    def infer_detections(self, frames, imgsz=None):
+        from models.yolov11_pose import Detections
+
+        if not isinstance(frames, list):
+            frames = [frames]
+        time.sleep(self.delay)
+        results = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            cls = self.rng.integers(0, len(self.names), size=1).astype(np.float32)
+            conf = self.rng.uniform(0.3, 0.99, size=1).astype(np.float32)
+            xyxy = np.array([[width * 0.25, height * 0.25, width * 0.75, height * 0.75]], dtype=np.float32)
+            keypoints = self.rng.uniform(0, min(height, width), size=(1, 21, 3)).astype(np.float32)
+            results.append(Detections(self.names, cls, conf, xyxy, keypoints))
+        return results
+
+    def warmup(self, passes=1, shape=(480, 640)):
+        return 0.0
+
+
+def load_frames(image_dir, limit, seed=0):
+    """JPEG bytes of up to `limit` images, or synthetic frames with random shapes if none are found"""
+    paths = sorted(p for p in Path(image_dir).glob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))[:limit] \
+        if image_dir else []
+    frames = []
+    for path in paths:
+        img = cv2.imread(str(path))
+        if img is not None:
+            frames.append(cv2.imencode(".jpg", img)[1].tobytes())
+    if frames:
+        return frames
+
+    # Distinct shapes per frame, so the frame cache does not treat them as duplicates
+    print(f"No images found in {image_dir}, using {limit} synthetic 480x640 frames")
+    rng = np.random.default_rng(seed)
+    for _ in range(limit):
+        img = np.full((480, 640, 3), rng.integers(0, 255, 3), dtype=np.uint8)
+        for _ in range(6):
+            x, y = int(rng.integers(0, 640)), int(rng.integers(0, 480))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.circle(img, (x, y), int(rng.integers(20, 120)), color, -1)
+        frames.append(cv2.imencode(".jpg", img)[1].tobytes())
+    return frames
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_server_timing(header):
+    """Stage durations in ms from a Server-Timing header"""
+    stages = {}
+    for part in header.split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+
+class ScenarioStats:
+    """Latencies, errors and Server-Timing stages collected for one scenario"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.stages = {}
+
+    def record(self, seconds, ok, server_timing=None):
+        if not ok:
+            self.errors += 1
+            return
+        self.latencies.append(seconds)
+        if server_timing:
+            for stage, ms in parse_server_timing(server_timing).items():
+                self.stages.setdefault(stage, []).append(ms)
+
+    def report(self, elapsed):
+        latencies_ms = [s * 1000.0 for s in self.latencies]
+        report = {
+            "requests": len(self.latencies) + self.errors,
+            "errors": self.errors,
+            "throughput_rps": len(self.latencies) / elapsed if elapsed > 0 else 0.0,
+        }
+        if latencies_ms:
+            report["latency_ms"] = {
+                "mean": statistics.mean(latencies_ms),
+                "p50": percentile(latencies_ms, 50),
+                "p95": percentile(latencies_ms, 95),
+                "p99": percentile(latencies_ms, 99),
+                "max": max(latencies_ms),
+            }
+        if self.stages:
+            report["stages_ms"] = {stage: statistics.mean(values) for stage, values in self.stages.items()}
+        return report
+
+
+class ServerThread:
+    """Runs the app on a local uvicorn server in a background thread"""
+
+    def __init__(self, app):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+async def run_workers(concurrency, total, worker):
+    """Run `total` requests over `concurrency` virtual users; returns elapsed seconds"""
+    counter = iter(range(total))
+
+    async def user(user_id):
+        for index in counter:
+            await worker(user_id, index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def timed(stats, request):
+    start = time.perf_counter()
+    try:
+        response = await request
+    except Exception:
+        stats.record(time.perf_counter() - start, False)
+        return None
+    elapsed = time.perf_counter() - start
+    ok = response.status_code < 400 and "error" not in response.text[:20]
+    stats.record(elapsed, ok, response.headers.get("server-timing"))
+    return response
+
+
+async def bench_frames(client, path, frames, concurrency, total):
+    stats = ScenarioStats()
+
+    async def worker(user_id, index):
+        headers = {"Content-Type": "image/jpeg", "X-Session-ID": f"bench-{user_id}"}
+        await timed(stats, client.post(path, content=frames[index % len(frames)], headers=headers))
+
+    return stats.report(await run_workers(concurrency, total, worker))
+
+
+async def bench_websocket(port, frames, concurrency, total):
+    import websockets
+
+    stats = ScenarioStats()
+    per_user = max(1, total // concurrency)
+
+    async def user(user_id):
+        url = f"ws://127.0.0.1:{port}/ws/predict?session_id=bench-ws-{user_id}"
+        async with websockets.connect(url, max_size=None) as ws:
+            for index in range(per_user):
+                start = time.perf_counter()
+                await ws.send(frames[(user_id + index) % len(frames)])
+                reply = json.loads(await ws.recv())
+                stats.record(time.perf_counter() - start, "error" not in reply)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return stats.report(time.perf_counter() - start)
+
+
+async def setup_users(client, concurrency):
+    """Register one user per virtual user and return their bearer tokens"""
+    tokens = []
+    suffix = int(time.time())
+    for i in range(concurrency):
+        username = f"bench{suffix}_{i}"
+        await client.post("/api/auth/register", json={
+            "username": username, "email": f"{username}@bench.local", "password": "benchmark",
+        })
+        response = await client.post("/api/auth/login", data={"username": username, "password": "benchmark"})
+        tokens.append((username, response.json()["access_token"]))
+    return tokens
+
+
+async def bench_auth(client, tokens, scenario, concurrency, total):
+    stats = ScenarioStats()
+
+    async def worker(user_id, index):
+        username, token = tokens[user_id]
+        if scenario == "login":
+            request = client.post("/api/auth/login", data={"username": username, "password": "benchmark"})
+        else:
+            request = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+        await timed(stats, request)
+
+    return stats.report(await run_workers(concurrency, total, worker))
+
+
+async def run_benchmark(port, frames, scenarios, concurrency, total):
+    import httpx
+
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        tokens = await setup_users(client, concurrency) if {"login", "me"} & set(scenarios) else []
+        for scenario in scenarios:
+            if scenario in ("predict", "detect"):
+                result = await bench_frames(client, f"/api/{scenario}", frames, concurrency, total)
+            elif scenario == "ws_predict":
+                result = await bench_websocket(port, frames, concurrency, total)
+            else:
+                result = await bench_auth(client, tokens, scenario, concurrency, total)
+            results[scenario] = result
+            latency = result.get("latency_ms", {})
+            print(
+                f"✓ {scenario:<10} p50 {latency.get('p50', 0):7.1f} ms  p95 {latency.get('p95', 0):7.1f} ms  "
+                f"p99 {latency.get('p99', 0):7.1f} ms  {result['throughput_rps']:7.1f} req/s  "
+                f"{result['errors']} errors"
+            )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print latency and throughput changes against an earlier run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('meta', {}).get('commit')}):")
+    for scenario, result in results.items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before or "latency_ms" not in before or "latency_ms" not in result:
+            continue
+        changes = []
+        for key in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][key], result["latency_ms"][key]
+            changes.append(f"{key} {(new - old) / old * 100 if old else 0:+6.1f}%")
+        old_rps, new_rps = before["throughput_rps"], result["throughput_rps"]
+        changes.append(f"throughput {(new_rps - old_rps) / old_rps * 100 if old_rps else 0:+6.1f}%")
+        print(f"  {scenario:<10} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Weights to serve instead of the stub model")
+    parser.add_argument("--stub-delay-ms", type=float, default=5.0, help="Stub model forward pass time")
+    parser.add_argument("--images", default="uploadedFile", help="Directory of frames to replay")
+    parser.add_argument("--limit", type=int, default=32, help="Number of frames to replay")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--database-url", help="Database to register bench users in (default: a throwaway SQLite file)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier --json output to compare against")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"✗ Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 1
+
+    # Configure the app before it is imported: throwaway SQLite database and
+    # frame archive, in-process sessions and thread inference so a stub model
+    # can be served. Archiving stays on so its cost is measured, but stub
+    # frames never reach the real retraining archive
+    workdir = tempfile.mkdtemp(prefix="yoloapp-bench-")
+    # Set unconditionally, so exported database URLs never get bench users
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.pop("DATABASE_ASYNC_URL", None)
+    os.environ["FRAME_ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+    os.environ["SESSION_STORE"] = "memory"
+    os.environ["INFERENCE_EXECUTOR"] = "thread"
+    if args.model:
+        os.environ["MODEL_PATH"] = args.model
+
+    from app import app
+    from services.model_registry import DEFAULT_MODEL, registry
+
+    if not args.model:
+        registry.add(DEFAULT_MODEL, StubPoseModel(args.stub_delay_ms))
+
+    frames = load_frames(args.images, args.limit)
+    print(f"Benchmarking {', '.join(scenarios)} with {args.concurrency} users, {args.requests} requests each")
+
+    with ServerThread(app) as server:
+        results = asyncio.run(run_benchmark(server.port, frames, scenarios, args.concurrency, args.requests))
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "model": args.model or f"stub ({args.stub_delay_ms} ms)",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "frames": len(frames),
+        },
+        "scenarios": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+    return 0 if all(r["errors"] == 0 for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
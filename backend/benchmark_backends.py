@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PyTorch and exported (ONNX / OpenVINO) inference backends on the same frames
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from models.yolov11_pose import YOLOv11PoseModel
+from services.model_export import resolve_model_path
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_frames(image_dir, limit):
+    """Load up to `limit` images, falling back to random frames if none are found"""
+    paths = sorted(Path(image_dir).glob("*.jpg"))[:limit] if image_dir else []
+    frames = [img for img in (cv2.imread(str(p)) for p in paths) if img is not None]
+    if not frames:
+        print(f"No images found in {image_dir}, using random 480x640 frames")
+        frames = [np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(limit)]
+    return frames
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_backend(model_path, backend, frames, imgsz, batch_size, warmup):
+    """Measure single-frame latency and batched throughput for one backend"""
+    path = resolve_model_path(model_path, backend, imgsz)
+    model = YOLOv11PoseModel(path, imgsz=imgsz)
+    model.warmup(warmup, frames[0].shape[:2])
+
+    # Single-frame latency, as seen by one webcam client
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        model.infer(frame)
+        latencies.append(time.perf_counter() - start)
+
+    # Throughput with batched forward passes, as run by the scheduler
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        model.infer(frames[i:i + batch_size])
+    batched_elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "path": path,
+        "frames": len(frames),
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000.0,
+            "p50": percentile(latencies, 50) * 1000.0,
+            "p95": percentile(latencies, 95) * 1000.0,
+        },
+        "single_fps": len(frames) / sum(latencies),
+        "batch_size": batch_size,
+        "batched_fps": len(frames) / batched_elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="models/best.pt", help="PyTorch weights to benchmark")
+    parser.add_argument("--backends", default="torch,onnx", help="Comma-separated backends (torch, onnx, openvino)")
+    parser.add_argument("--images", default="uploadedFile", help="Directory of sample frames")
+    parser.add_argument("--limit", type=int, default=32, help="Number of frames to run")
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference input size")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for the throughput run")
+    parser.add_argument("--warmup", type=int, default=2, help="Warmup passes per backend")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.limit)
+    print(f"Benchmarking {len(frames)} frames from {args.images}")
+
+    results = []
+    for backend in args.backends.split(","):
+        backend = backend.strip()
+        try:
+            result = benchmark_backend(args.model, backend, frames, args.imgsz, args.batch_size, args.warmup)
+        except Exception as e:
+            print(f"✗ {backend}: {e}")
+            continue
+        results.append(result)
+        print(
+            f"✓ {backend:<9} p50 {result['latency_ms']['p50']:7.1f} ms  "
+            f"p95 {result['latency_ms']['p95']:7.1f} ms  "
+            f"{result['single_fps']:6.1f} fps single  "
+            f"{result['batched_fps']:6.1f} fps batch={args.batch_size}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
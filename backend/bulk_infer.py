@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Run the model over a directory of images in parallel and write columnar results, skipping images already processed
+
+Images are read, hashed and decoded on a thread pool ahead of inference,
+batched forward passes run on a process pool, and detections are written in
+shards (NPZ, or Parquet with pyarrow) next to an index keyed by each image's
+content hash. Re-running on the same output directory only processes new or
+changed images, so an interrupted run resumes where its last shard ended.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from services.inference_executor import set_torch_threads
+from services.model_export import MODEL_BACKEND, resolve_model_path
+from services.model_registry import MODEL_IMGSZ, MODEL_PATH
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+INDEX_FILE = "index.json"
+FORMATS = ("npz", "parquet")
+
+# Model replica owned by a process pool worker
+_worker_model = None
+
+
+def _init_worker(model_path, imgsz, num_threads):
+    global _worker_model
+    set_torch_threads(num_threads)
+    from models.yolov11_pose import YOLOv11PoseModel
+    _worker_model = YOLOv11PoseModel(model_path, imgsz=imgsz)
+
+
+def detect_batch(images):
+    """Run one batched forward pass on the worker's model (process pool task)"""
+    return _worker_model.detect_pose_batch(images)
+
+
+def list_images(directory):
+    return sorted(p for p in Path(directory).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file())
+
+
+def load_image(path, done):
+    """Read and hash an image, decoding it unless its hash is in `done`; returns (hash, image or None)"""
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest in done:
+        return digest, None
+    return digest, cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def prefetch(paths, readers, done, lookahead):
+    """Yield (path, hash, image) in order while up to `lookahead` images load in the background"""
+    pending = deque()
+    for path in paths:
+        pending.append((path, readers.submit(load_image, path, done)))
+        if len(pending) >= lookahead:
+            path, future = pending.popleft()
+            yield (path, *future.result())
+    while pending:
+        path, future = pending.popleft()
+        yield (path, *future.result())
+
+
+class ResultWriter:
+    """Buffers detections and writes them as numbered shards plus a content-hash index.
+
+    The index is only updated after a shard is fully written, so it never
+    points at missing rows; it maps each image hash to its shard and row.
+    """
+
+    def __init__(self, output, fmt="npz", shard_size=2048):
+        self.output = Path(output)
+        self.output.mkdir(parents=True, exist_ok=True)
+        self.format = fmt
+        self.shard_size = max(1, shard_size)
+        self.index = self.load_index()
+        existing = [int(p.stem.split("-")[1]) for p in self.output.glob("part-*.*") if p.stem.split("-")[1].isdigit()]
+        self.next_shard = max(existing, default=0) + 1
+        self.rows = []
+        self.names = None
+        self.written = 0
+
+    def load_index(self):
+        path = self.output / INDEX_FILE
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["images"]
+
+    def add(self, digest, path, detections):
+        """Buffer one image's detections, returning the shard name when this fills a shard"""
+        self.names = self.names or {int(k): v for k, v in detections.names.items()}
+        self.rows.append((digest, path, detections))
+        if len(self.rows) >= self.shard_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Write buffered rows as the next shard and record them in the index"""
+        if not self.rows:
+            return None
+        name = f"part-{self.next_shard:05d}.{self.format}"
+        target = self.output / name
+        temporary = self.output / f".{name}.tmp"
+        if self.format == "parquet":
+            self.write_parquet(temporary)
+        else:
+            self.write_npz(temporary)
+        os.replace(temporary, target)
+
+        for row, (digest, path, _) in enumerate(self.rows):
+            self.index[digest] = {"path": path, "shard": name, "row": row}
+        self.save_index()
+        self.next_shard += 1
+        self.written += len(self.rows)
+        self.rows = []
+        return name
+
+    def write_npz(self, target):
+        # Detections of all images are concatenated; image i owns rows offsets[i]:offsets[i + 1]
+        detections = [d for _, _, d in self.rows]
+        offsets = np.zeros(len(detections) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in detections])
+        columns = {
+            "hash": np.array([digest for digest, _, _ in self.rows]),
+            "path": np.array([path for _, path, _ in self.rows]),
+            "offsets": offsets,
+            "cls": np.concatenate([d.cls for d in detections]).astype(np.int64),
+            "conf": np.concatenate([d.conf for d in detections]).astype(np.float32),
+            "xyxy": np.concatenate([d.xyxy for d in detections]).astype(np.float32).reshape(-1, 4),
+            "names": np.array(json.dumps(self.names)),
+        }
+        keypoints = [d.keypoints for d in detections if len(d)]
+        if keypoints and all(k is not None for k in keypoints):
+            columns["keypoints"] = np.concatenate(keypoints).astype(np.float32)
+        with open(target, "wb") as f:
+            np.savez_compressed(f, **columns)
+
+    def write_parquet(self, target):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        detections = [d for _, _, d in self.rows]
+        table = pa.table({
+            "hash": [digest for digest, _, _ in self.rows],
+            "path": [path for _, path, _ in self.rows],
+            "classes": [d.class_names() for d in detections],
+            "cls": [d.cls.tolist() for d in detections],
+            "conf": [d.conf.tolist() for d in detections],
+            "xyxy": [d.xyxy.tolist() for d in detections],
+            "keypoints": [d.keypoints.tolist() if d.keypoints is not None else [] for d in detections],
+        })
+        pq.write_table(table, target)
+
+    def save_index(self):
+        path = self.output / INDEX_FILE
+        temporary = self.output / f".{INDEX_FILE}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"format": self.format, "names": self.names, "images": self.index}, f)
+        os.replace(temporary, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="?", default="uploadedFile", help="Directory of images (searched recursively)")
+    parser.add_argument("--output", default="bulk_results", help="Directory for result shards and the index")
+    parser.add_argument("--format", choices=FORMATS, default="npz", help="Shard format (parquet needs pyarrow)")
+    parser.add_argument("--model", default=MODEL_PATH, help="Weights to run")
+    parser.add_argument("--backend", default=MODEL_BACKEND, help="torch, onnx, openvino or onnx-int8")
+    parser.add_argument("--imgsz", type=int, default=MODEL_IMGSZ, help="Model input size")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per forward pass")
+    parser.add_argument("--workers", type=int, default=2, help="Inference processes")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Threads reading and decoding images")
+    parser.add_argument("--shard-size", type=int, default=2048, help="Images per result shard")
+    parser.add_argument("--force", action="store_true", help="Process every image, ignoring the index")
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("✗ Parquet output needs pyarrow: pip install pyarrow")
+            return 1
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"✗ No images found in {args.images}")
+        return 1
+
+    writer = ResultWriter(args.output, args.format, args.shard_size)
+    done = set() if args.force else set(writer.index)
+    print(f"Found {len(paths)} images in {args.images}, {len(done)} already in the index")
+
+    # Export (if needed) once here rather than in every worker
+    model_path = resolve_model_path(args.model, args.backend, args.imgsz)
+    workers = max(1, args.workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.perf_counter()
+    skipped = unreadable = 0
+    seen = set()
+    root = Path(args.images)
+    with ThreadPoolExecutor(max_workers=max(1, args.decode_threads), thread_name_prefix="decode") as readers, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(model_path, args.imgsz, threads)) as pool:
+        in_flight = deque()
+
+        def drain_one():
+            batch, future = in_flight.popleft()
+            for (digest, path), detections in zip(batch, future.result()):
+                shard = writer.add(digest, path, detections)
+                if shard:
+                    elapsed = time.perf_counter() - start
+                    print(f"✓ Wrote {shard}, {writer.written} images so far ({writer.written / elapsed:.1f} images/s)")
+
+        def submit(batch):
+            in_flight.append(([(digest, path) for digest, path, _ in batch],
+                              pool.submit(detect_batch, [image for _, _, image in batch])))
+            # Keep each worker busy with one batch while the next one waits
+            while len(in_flight) > workers * 2:
+                drain_one()
+
+        batch = []
+        lookahead = args.batch_size * (workers * 2 + 1)
+        for path, digest, image in prefetch(paths, readers, done, lookahead):
+            if digest in done or digest in seen:
+                skipped += 1
+                continue
+            if image is None:
+                unreadable += 1
+                logger.warning(f"Could not decode {path}")
+                continue
+            seen.add(digest)
+            batch.append((digest, str(path.relative_to(root)), image))
+            if len(batch) >= args.batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        while in_flight:
+            drain_one()
+    writer.flush()
+
+    elapsed = time.perf_counter() - start
+    processed = len(seen)
+    print(f"✓ Processed {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} images/s)")
+    print(f"✓ Skipped {skipped} already processed or duplicate images")
+    if unreadable:
+        print(f"✗ {unreadable} images could not be decoded")
+    print(f"Results in {args.output} ({len(writer.index)} images indexed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 import logging
@@ -13,14 +14,57 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Connect to MySQL database
-DATABASE_URL = "mysql+pymysql://root:@localhost/yolo_web"
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost/yolo_web")
 logger.info(f"Using database: {DATABASE_URL}")
 
+# Connection pool settings, overridable from the environment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections before MySQL's wait_timeout closes them server-side
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Async engine for the API handlers (needs aiomysql, or aiosqlite for SQLite)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "0") == "1"
+ASYNC_DRIVERS = {"mysql+pymysql": "mysql+aiomysql", "mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+def pool_options(url):
+    """Pool settings for an engine; SQLite's file-lock pools take none of them"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def async_database_url(url):
+    """Async driver URL for a sync database URL, unless DATABASE_ASYNC_URL is set"""
+    if os.getenv("DATABASE_ASYNC_URL"):
+        return os.getenv("DATABASE_ASYNC_URL")
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
 # Create the SQLAlchemy engine for MySQL
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 # Create a SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay loaded after commit, so a freshly inserted row needs no refresh SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    # Objects stay usable after commit without an (async) refresh
+    AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    logger.info(f"Using async database driver: {ASYNC_DATABASE_URL.split('://', 1)[0]}")
 
 # Create a Base class for models
 Base = declarative_base()
@@ -32,3 +76,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for async handlers: an AsyncSession when DATABASE_ASYNC is set,
+# otherwise a sync Session whose queries the User *_async methods run in the
+# threadpool. Either way the event loop never waits on the database.
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+def pool_stats():
+    """Connection pool utilization of the sync and async engines"""
+    stats = {}
+    for name, eng in (("sync", engine), ("async", async_engine and async_engine.sync_engine)):
+        if not eng:
+            continue
+        pool = eng.pool
+        stats[name] = {"pool": type(pool).__name__, "status": pool.status()}
+        if hasattr(pool, "checkedout"):
+            stats[name].update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+    return stats
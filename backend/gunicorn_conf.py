@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for running the backend with several worker processes
+
+Used by `start_server.py --workers N`, or directly:
+    gunicorn -c gunicorn_conf.py app:app
+Send SIGHUP to the master to gracefully replace all workers.
+"""
+import gc
+import logging
+import os
+
+from services.inference_executor import INFERENCE_EXECUTOR, INFERENCE_WORKERS, TORCH_NUM_THREADS, set_torch_threads
+from services.model_export import MODEL_BACKEND
+
+logger = logging.getLogger(__name__)
+
+bind = f"{os.getenv('SERVER_HOST', '127.0.0.1')}:{os.getenv('SERVER_PORT', '8001')}"
+workers = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Workers get this long to finish in-flight requests on restart or shutdown
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("SERVER_TIMEOUT", "120"))
+# Recycle workers after this many requests (0 disables), staggered by the jitter
+max_requests = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# Load the app, and the torch model weights, once in the master so forked
+# workers share their memory pages copy-on-write. ONNX Runtime / OpenVINO
+# sessions and process pools are not fork-safe, so those backends load in
+# each worker instead.
+preload_app = os.getenv("SERVER_PRELOAD", "auto")
+if preload_app == "auto":
+    preload_app = MODEL_BACKEND == "torch" and INFERENCE_EXECUTOR == "thread"
+else:
+    preload_app = preload_app == "1"
+
+
+def worker_torch_threads():
+    """Torch threads per worker, splitting the cores between all inference threads"""
+    if TORCH_NUM_THREADS > 0:
+        return TORCH_NUM_THREADS
+    return max(1, (os.cpu_count() or 1) // (workers * max(1, INFERENCE_WORKERS)))
+
+
+def on_starting(server):
+    if not preload_app:
+        return
+    from services.model_registry import registry
+
+    # Warmup runs in each worker after fork; torch thread pools started in the
+    # master would not survive the fork
+    registry.load_all(warmup=False)
+    # Keep the GC from touching (and so copying) the preloaded objects' pages
+    gc.freeze()
+    logger.info("Models preloaded in the master process")
+
+
+def post_fork(server, worker):
+    set_torch_threads(worker_torch_threads())
+    if preload_app:
+        # Connections opened in the master must not be shared between workers
+        from database import engine
+        engine.dispose(close=False)
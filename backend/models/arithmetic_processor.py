@@ -1,102 +1,197 @@
 """
 Arithmetic processor for handling sign language calculator logic
 """
+import operator
+
+# Map for converting class names to mathematical symbols
+OPERATOR_MAP = {
+    "tambah": "+",
+    "kurang": "-",
+    "kali": "*",
+    "bagi": "/",
+    # Also include direct symbol mappings if your model predicts them
+    "+": "+",
+    "-": "-",
+    "x": "*",
+    "/": "/"
+}
+
+# Longest number that can be entered digit by digit
+MAX_DIGITS = 6
+
+DIGIT = "digit"
+OPERATOR = "operator"
+
+
+def _divide(a, b):
+    return a / b if b != 0 else "Error"
+
+
+# Arithmetic for every operator symbol, looked up instead of evaluating an expression
+OPERATIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": _divide,
+}
+
+
+def build_token_table(operator_map=OPERATOR_MAP):
+    """Precompute (kind, value) for every class name the calculator reacts to"""
+    tokens = {str(d): (DIGIT, d) for d in range(10)}
+    tokens.update({name: (OPERATOR, symbol) for name, symbol in operator_map.items()})
+    return tokens
+
+
+TOKENS = build_token_table()
+
 
 class ArithmeticProcessor:
-    """Handles the arithmetic calculation logic and state management"""
-    
+    """Handles the arithmetic calculation logic and state management
+
+    Digits append to the number being entered, so multi-digit numbers are
+    shown one digit at a time. The result is computed as soon as the second
+    number has a digit and updated as more digits follow; showing an operator
+    on a result chains it into a new calculation.
+    """
+
+    __slots__ = ("current_state", "number_1", "operator", "number_2", "result")
+
+    FIELDS = __slots__
+
     def __init__(self):
         self.reset()
-    
+
     def reset(self):
         """Reset the calculator state"""
-        self.state = {
-            "current_state": "WAIT_FIRST_NUM",
-            "number_1": None,
-            "operator": None,
-            "number_2": None,
-            "result": None
-        }
-    
+        self.current_state = "WAIT_FIRST_NUM"
+        self.number_1 = None
+        self.operator = None
+        self.number_2 = None
+        self.result = None
+
+    @classmethod
+    def from_state(cls, state):
+        """Create a processor from a serialized state dict"""
+        processor = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(processor, field, state[field])
+        return processor
+
     def get_state(self):
-        """Get current calculator state"""
-        return self.state.copy()
-    
-    def process_input(self, detected_class, operator_map):
-        """Process a detected class and update state accordingly"""
-        
+        """Get current calculator state as a dict, for responses and session storage"""
+        return {
+            "current_state": self.current_state,
+            "number_1": self.number_1,
+            "operator": self.operator,
+            "number_2": self.number_2,
+            "result": self.result,
+        }
+
+    def process_input(self, detected_class, tokens=TOKENS):
+        """Process a detected class, returning True if the state changed"""
+
         # Handle reset command
         if detected_class == 'Start':
             self.reset()
-            return self.state.copy()
-        
-        # Handle undefined gestures
-        if detected_class == 'Undefined':
-            return self.state.copy()
-        
-        is_operator = detected_class in operator_map
-        is_digit = detected_class.isdigit()
-        
-        # State machine logic
-        if self.state["current_state"] == "WAIT_FIRST_NUM":
-            if is_digit:
-                self.state["number_1"] = int(detected_class)
-                self.state["current_state"] = "WAIT_OPERATOR"
-        
-        elif self.state["current_state"] == "WAIT_OPERATOR":
-            if is_operator:
-                self.state["operator"] = operator_map[detected_class]
-                self.state["current_state"] = "WAIT_SECOND_NUM"
-            elif is_digit:  # Allow overwriting first number
-                self.state["number_1"] = int(detected_class)
-        
-        elif self.state["current_state"] == "WAIT_SECOND_NUM":
-            if is_digit:
-                self.state["number_2"] = int(detected_class)
-                # Perform calculation
-                self._calculate()
-                self.state["current_state"] = "SHOWING_RESULT"
-            elif is_operator:  # Allow overwriting operator
-                self.state["operator"] = operator_map[detected_class]
-        
-        return self.state.copy()
-    
+            return True
+
+        # Undefined and unknown gestures leave the state unchanged
+        token = tokens.get(detected_class)
+        if token is None:
+            return False
+
+        kind, value = token
+        handler = self._TRANSITIONS.get((self.current_state, kind))
+        return handler(self, value) if handler is not None else False
+
+    @staticmethod
+    def _append_digit(number, digit):
+        if number is None:
+            return digit
+        if len(str(number)) >= MAX_DIGITS:
+            return number
+        return number * 10 + digit
+
+    def _start_first_number(self, digit):
+        self.number_1 = digit
+        self.current_state = "WAIT_OPERATOR"
+        return True
+
+    def _extend_first_number(self, digit):
+        number = self._append_digit(self.number_1, digit)
+        changed = number != self.number_1
+        self.number_1 = number
+        return changed
+
+    def _set_operator(self, symbol):
+        self.operator = symbol
+        self.current_state = "WAIT_SECOND_NUM"
+        return True
+
+    def _replace_operator(self, symbol):
+        changed = symbol != self.operator
+        self.operator = symbol
+        return changed
+
+    def _start_second_number(self, digit):
+        self.number_2 = digit
+        self._calculate()
+        self.current_state = "SHOWING_RESULT"
+        return True
+
+    def _extend_second_number(self, digit):
+        number = self._append_digit(self.number_2, digit)
+        if number == self.number_2:
+            return False
+        self.number_2 = number
+        self._calculate()
+        return True
+
+    def _chain(self, symbol):
+        """Start a new calculation on the previous result"""
+        if isinstance(self.result, str):
+            return False
+        self.number_1 = self.result
+        self.operator = symbol
+        self.number_2 = None
+        self.result = None
+        self.current_state = "WAIT_SECOND_NUM"
+        return True
+
+    # (state, input kind) -> transition; pairs not listed are ignored
+    _TRANSITIONS = {
+        ("WAIT_FIRST_NUM", DIGIT): _start_first_number,
+        ("WAIT_OPERATOR", DIGIT): _extend_first_number,
+        ("WAIT_OPERATOR", OPERATOR): _set_operator,
+        ("WAIT_SECOND_NUM", DIGIT): _start_second_number,
+        ("WAIT_SECOND_NUM", OPERATOR): _replace_operator,
+        ("SHOWING_RESULT", DIGIT): _extend_second_number,
+        ("SHOWING_RESULT", OPERATOR): _chain,
+    }
+
     def _calculate(self):
         """Perform the arithmetic calculation"""
+        operation = OPERATIONS.get(self.operator)
+        if operation is None or self.number_1 is None or self.number_2 is None:
+            self.result = "Invalid"
+            return
         try:
-            num1 = self.state["number_1"]
-            op = self.state["operator"]
-            num2 = self.state["number_2"]
-            
-            if all(x is not None for x in [num1, op, num2]):
-                if op == "+":
-                    self.state["result"] = num1 + num2
-                elif op == "-":
-                    self.state["result"] = num1 - num2
-                elif op == "*":
-                    self.state["result"] = num1 * num2
-                elif op == "/":
-                    if num2 != 0:
-                        self.state["result"] = num1 / num2
-                    else:
-                        self.state["result"] = "Error"
-                else:
-                    self.state["result"] = "Invalid"
-            
+            self.result = operation(self.number_1, self.number_2)
         except Exception:
-            self.state["result"] = "Error"
-    
+            self.result = "Error"
+
     def get_status_message(self):
         """Get a user-friendly status message"""
-        state = self.state["current_state"]
-        
+        state = self.current_state
+
         if state == "WAIT_FIRST_NUM":
             return "Please show the first number (0-9)."
         elif state == "WAIT_OPERATOR":
-            return f"Got it: {self.state['number_1']}. Now show an operator."
+            return f"Got it: {self.number_1}. Show another digit or an operator."
         elif state == "WAIT_SECOND_NUM":
-            return f"OK: {self.state['number_1']} {self.state['operator']}. Now show the second number."
+            return f"OK: {self.number_1} {self.operator}. Now show the second number."
         elif state == "SHOWING_RESULT":
-            return "Calculation complete! Show 'Start' to reset."
+            return "Calculation complete! Show another digit, an operator to continue, or 'Start' to reset."
         else:
-            return "Ready to start."
\ No newline at end of file
+            return "Ready to start."
@@ -1,14 +1,50 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
+from fastapi.concurrency import run_in_threadpool
 from database import Base
 from passlib.context import CryptContext
 import logging
+import os
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost factor are upgraded (or downgraded) on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Users inserted per statement by bulk_create
+BULK_INSERT_BATCH = int(os.getenv("BULK_INSERT_BATCH", "500"))
+
+class DuplicateUserError(ValueError):
+    """Raised when a username or email violates its unique index"""
+
+    def __init__(self, field):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+def duplicate_field(error: IntegrityError):
+    """Which unique column an IntegrityError is about ('username' or 'email'), or None"""
+    message = str(error.orig)
+    # MySQL: "Duplicate entry 'x' for key 'users.ix_users_email'"
+    # SQLite: "UNIQUE constraint failed: users.email"
+    if "for key" in message:
+        key = message.rsplit("for key", 1)[1]
+    else:
+        key = message.rsplit(":", 1)[-1]
+    for field in ("email", "username"):
+        if field in key:
+            return field
+    return None
 
 class User(Base):
     __tablename__ = "users"
@@ -36,26 +72,44 @@ class User(Base):
             return None
     
     @classmethod
-    def create(cls, db, username, email, password):
+    def create(cls, db, username, email, password=None, hashed_password=None):
         try:
-            # Hash the password
-            hashed_password = pwd_context.hash(password)
+            # Hash the password, unless the caller already hashed it off the event loop
+            if hashed_password is None:
+                hashed_password = pwd_context.hash(password)
             
             # Create a new user object
             user = cls(username=username, email=email, password=hashed_password)
             
-            # Add and commit the user to the database
+            # A single INSERT; the unique indexes reject duplicates, and the
+            # session keeps the object loaded so no refresh SELECT is needed
             db.add(user)
             db.commit()
-            db.refresh(user)
             
             logger.info(f"User created successfully: {username}")
             return user
+        except IntegrityError as e:
+            db.rollback()
+            field = duplicate_field(e)
+            if field is None:
+                raise
+            raise DuplicateUserError(field)
         except Exception as e:
             db.rollback()
             logger.error(f"Error creating user: {e}")
             raise
     
+    @classmethod
+    def update_password_hash(cls, db, user, hashed_password):
+        """Store a rehashed password, e.g. after the cost factor changed"""
+        try:
+            user.password = hashed_password
+            db.commit()
+            logger.info(f"Password hash updated for user: {user.username}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error updating password hash: {e}")
+
     @staticmethod
     def verify_password(plain_password, hashed_password):
         try:
@@ -73,3 +127,122 @@ class User(Base):
             logger.error(f"Error verifying password: {e}")
             print(f"Password verification error: {str(e)}")
             return False
+
+    @classmethod
+    def bulk_create(cls, db, users, batch_size=BULK_INSERT_BATCH):
+        """Insert many users with already hashed passwords.
+
+        `users` are dicts with username, email and password (the hash). Users
+        whose username or email already exists, in the database or earlier in
+        `users`, are skipped. Returns (created usernames, skipped list).
+        """
+        created, skipped = [], []
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+            usernames = [u["username"] for u in batch]
+            emails = [u["email"] for u in batch]
+            # One SELECT per batch finds the rows that would collide
+            taken = db.execute(
+                select(cls.username, cls.email).where(cls.username.in_(usernames) | cls.email.in_(emails))
+            ).all()
+            taken_usernames = {row.username for row in taken}
+            taken_emails = {row.email for row in taken}
+
+            rows = []
+            for user in batch:
+                if user["username"] in taken_usernames:
+                    skipped.append({"username": user["username"], "reason": "Username already registered"})
+                elif user["email"] in taken_emails:
+                    skipped.append({"username": user["username"], "reason": "Email already registered"})
+                else:
+                    rows.append(user)
+                    taken_usernames.add(user["username"])
+                    taken_emails.add(user["email"])
+            if not rows:
+                continue
+
+            try:
+                # executemany: one statement for the whole batch
+                db.execute(insert(cls), rows)
+                db.commit()
+                created.extend(u["username"] for u in rows)
+            except IntegrityError:
+                # A concurrent registration won a race; fall back to row by row
+                db.rollback()
+                for user in rows:
+                    try:
+                        cls.create(db, user["username"], user["email"], hashed_password=user["password"])
+                        created.append(user["username"])
+                    except DuplicateUserError as e:
+                        skipped.append({"username": user["username"], "reason": str(e).capitalize()})
+
+        logger.info(f"Bulk import: {len(created)} users created, {len(skipped)} skipped")
+        return created, skipped
+
+    # --- Async variants for request handlers ---
+    # They take the session from database.get_async_db: queries are awaited
+    # on an AsyncSession, or run in the threadpool for a sync Session.
+
+    @staticmethod
+    def _is_async(db):
+        return not isinstance(db, Session)
+
+    @classmethod
+    async def _first_async(cls, db, condition, sync_method, value):
+        if not cls._is_async(db):
+            return await run_in_threadpool(sync_method, db, value)
+        try:
+            result = await db.execute(select(cls).where(condition))
+            return result.scalars().first()
+        except Exception as e:
+            logger.error(f"Error getting user: {e}")
+            return None
+
+    @classmethod
+    async def get_by_username_async(cls, db, username):
+        return await cls._first_async(db, cls.username == username, cls.get_by_username, username)
+
+    @classmethod
+    async def get_by_email_async(cls, db, email):
+        return await cls._first_async(db, cls.email == email, cls.get_by_email, email)
+
+    @classmethod
+    async def create_async(cls, db, username, email, hashed_password):
+        if not cls._is_async(db):
+            return await run_in_threadpool(
+                cls.create, db, username, email, hashed_password=hashed_password
+            )
+        try:
+            user = cls(username=username, email=email, password=hashed_password)
+            db.add(user)
+            await db.commit()
+            logger.info(f"User created successfully: {username}")
+            return user
+        except IntegrityError as e:
+            await db.rollback()
+            field = duplicate_field(e)
+            if field is None:
+                raise
+            raise DuplicateUserError(field)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error creating user: {e}")
+            raise
+
+    @classmethod
+    async def update_password_hash_async(cls, db, user, hashed_password):
+        if not cls._is_async(db):
+            return await run_in_threadpool(cls.update_password_hash, db, user, hashed_password)
+        try:
+            user.password = hashed_password
+            await db.commit()
+            logger.info(f"Password hash updated for user: {user.username}")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error updating password hash: {e}")
+
+    @classmethod
+    async def bulk_create_async(cls, db, users, batch_size=BULK_INSERT_BATCH):
+        if not cls._is_async(db):
+            return await run_in_threadpool(cls.bulk_create, db, users, batch_size)
+        return await db.run_sync(lambda session: cls.bulk_create(session, users, batch_size))
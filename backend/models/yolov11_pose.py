@@ -1,31 +1,142 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import logging
+import time
+from typing import List, Union
 
 logger = logging.getLogger(__name__)
 
+_EMPTY_BOXES = np.zeros((0, 4), dtype=np.float32)
+
+class Detections:
+    """Array-backed detections for one frame.
+
+    Holds `cls` (N,), `conf` (N,), `xyxy` (N, 4) and optionally `keypoints`
+    (N, K, 2) as NumPy arrays, so filtering and ranking happen in NumPy and
+    Python objects are only built for the final response. `speed` is the
+    model's (preprocess, inference, postprocess) time per image in seconds,
+    when the backend reports it.
+    """
+
+    __slots__ = ("names", "cls", "conf", "xyxy", "keypoints", "speed")
+
+    def __init__(self, names, cls, conf, xyxy, keypoints=None, speed=None):
+        self.names = names
+        self.cls = cls
+        self.conf = conf
+        self.xyxy = xyxy
+        self.keypoints = keypoints
+        self.speed = speed
+
+    @classmethod
+    def from_result(cls, result):
+        """Pull boxes and keypoints out of an Ultralytics result in one transfer each"""
+        speed = getattr(result, "speed", None)
+        if speed:
+            # Ultralytics reports milliseconds per image
+            speed = tuple(speed.get(stage, 0.0) / 1000.0 for stage in ("preprocess", "inference", "postprocess"))
+        boxes = getattr(result, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return cls(result.names, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), _EMPTY_BOXES,
+                       speed=speed)
+
+        # boxes.data is (N, 6): x1, y1, x2, y2, conf, cls
+        data = boxes.data.cpu().numpy()
+        keypoints = getattr(result, "keypoints", None)
+        if keypoints is not None and getattr(keypoints, "xy", None) is not None:
+            keypoints = keypoints.xy.cpu().numpy()
+        else:
+            keypoints = None
+        return cls(result.names, data[:, 5].astype(np.int64), data[:, 4], data[:, :4], keypoints, speed)
+
+    def __len__(self):
+        return len(self.cls)
+
+    def best(self):
+        """Index of the highest-confidence detection, or None if there are none"""
+        return int(self.conf.argmax()) if len(self.conf) else None
+
+    def select(self, index):
+        """Detections at the given indices or boolean mask"""
+        keypoints = self.keypoints[index] if self.keypoints is not None else None
+        return Detections(self.names, self.cls[index], self.conf[index], self.xyxy[index], keypoints)
+
+    def filter(self, min_conf):
+        return self.select(self.conf >= min_conf)
+
+    def top_k(self, k):
+        return self.select(np.argsort(-self.conf, kind="stable")[:k])
+
+    def offset(self, dx, dy):
+        """Detections shifted by (dx, dy), e.g. to map a crop's boxes into the full frame"""
+        shift = np.array([dx, dy], dtype=self.xyxy.dtype)
+        keypoints = None
+        if self.keypoints is not None:
+            keypoints = self.keypoints.copy()
+            keypoints[..., :2] += shift
+        return Detections(self.names, self.cls, self.conf, self.xyxy + np.tile(shift, 2), keypoints)
+
+    def scaled(self, factor):
+        """Detections with coordinates multiplied by `factor`, e.g. to undo a downscaled decode"""
+        keypoints = self.keypoints * factor if self.keypoints is not None else None
+        return Detections(self.names, self.cls, self.conf, self.xyxy * factor, keypoints)
+
+    def class_names(self):
+        names = self.names
+        return [names[c] for c in self.cls.tolist()]
+
+    def to_list(self):
+        """Materialize as the API's list of {class, confidence, bbox} dicts"""
+        return [
+            {"class": name, "confidence": conf, "bbox": bbox}
+            for name, conf, bbox in zip(self.class_names(), self.conf.tolist(), self.xyxy.tolist())
+        ]
+
 class YOLOv11PoseModel:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, imgsz: int = 640):
         try:
             logger.info(f"Initializing YOLOv11PoseModel with path: {model_path}")
+            self.model_path = model_path
+            self.imgsz = imgsz
+            # ultralytics (and torch) are only imported once a model is loaded
+            from ultralytics import YOLO
             self.model = YOLO(model_path)
             logger.info("YOLOv11PoseModel initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize YOLOv11PoseModel: {e}")
             raise
 
-    def infer(self, image: np.ndarray):
+    @property
+    def names(self):
+        return self.model.names
+
+    def infer(self, image: Union[np.ndarray, List[np.ndarray]], imgsz: int = None):
         try:
-            logger.info(f"Running inference on image with shape: {image.shape}")
-            # Ultralytics YOLO models accept numpy arrays directly
-            results = self.model(image)
-            logger.info(f"Inference completed, got {len(results)} results")
+            # Ultralytics YOLO models accept numpy arrays or lists of them directly
+            results = self.model(image, imgsz=imgsz or self.imgsz, verbose=False)
+            logger.debug(f"Inference completed, got {len(results)} results")
             return results
         except Exception as e:
             logger.error(f"Error during inference: {e}")
             raise
 
+    def warmup(self, passes: int = 1, shape=(480, 640)):
+        """Run dummy passes so graph and kernel initialization happens before real traffic"""
+        frame = np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(passes):
+            self.model(frame, imgsz=self.imgsz, verbose=False)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Warmup completed: {passes} pass(es) in {elapsed:.2f}s")
+        return elapsed
+
+    def infer_detections(self, image: Union[np.ndarray, List[np.ndarray]], imgsz: int = None) -> List[Detections]:
+        """Run inference and return array-backed detections, one per image.
+
+        `imgsz` overrides the model's input size, e.g. for small crops.
+        """
+        return [Detections.from_result(result) for result in self.infer(image, imgsz)]
+
     def postprocess(self, results):
         # Extract pose keypoints and bounding boxes, handle empty/None results safely
         detections = []
@@ -34,34 +145,15 @@ class YOLOv11PoseModel:
             return detections
             
         try:
-            for i, result in enumerate(results):
-                logger.info(f"Processing result {i}")
-                # Defensive: handle missing boxes/keypoints attributes
-                boxes = []
-                keypoints = []
-                
-                if hasattr(result, 'boxes') and result.boxes is not None and hasattr(result.boxes, 'xyxy'):
-                    try:
-                        boxes = result.boxes.xyxy.cpu().numpy()
-                        logger.info(f"Found {len(boxes)} boxes")
-                    except Exception as e:
-                        logger.warning(f"Error processing boxes: {e}")
-                        boxes = []
-                        
-                if hasattr(result, 'keypoints') and result.keypoints is not None and hasattr(result.keypoints, 'xy'):
-                    try:
-                        keypoints = result.keypoints.xy.cpu().numpy()
-                        logger.info(f"Found {len(keypoints)} keypoints")
-                    except Exception as e:
-                        logger.warning(f"Error processing keypoints: {e}")
-                        keypoints = []
-                        
+            for result in results:
+                arrays = result if isinstance(result, Detections) else Detections.from_result(result)
+                keypoints = arrays.keypoints
                 detections.append({
-                    "boxes": boxes.tolist() if len(boxes) > 0 else [],
-                    "keypoints": keypoints.tolist() if len(keypoints) > 0 else []
+                    "boxes": arrays.xyxy.tolist(),
+                    "keypoints": keypoints.tolist() if keypoints is not None and len(keypoints) > 0 else []
                 })
-                
-            logger.info(f"Postprocessing completed, returning {len(detections)} detections")
+
+            logger.debug(f"Postprocessing completed, returning {len(detections)} detections")
             return detections
             
         except Exception as e:
@@ -70,16 +162,33 @@ class YOLOv11PoseModel:
 
     def detect_pose(self, image: np.ndarray):
         try:
-            logger.info("Starting pose detection")
             results = self.infer(image)
             detections = self.postprocess(results)
-            logger.info(f"Pose detection completed, found {len(detections)} detections")
+            logger.debug(f"Pose detection completed, found {len(detections)} detections")
             return detections
         except Exception as e:
             logger.error(f"Error in detect_pose: {e}")
             raise
 
+    def detect_pose_batch(self, images: Union[np.ndarray, List[np.ndarray]], batch_size: int = None,
+                          imgsz: int = None) -> List[Detections]:
+        """Detect on many images with batched forward passes, returning array-backed detections.
+
+        `images` is a list of frames or an (N, H, W, 3) array. They run in one
+        forward pass, or in passes of `batch_size` images to bound memory.
+        """
+        images = list(images)
+        if not images:
+            return []
+        batch_size = batch_size or len(images)
+        detections = []
+        for start in range(0, len(images), batch_size):
+            detections.extend(self.infer_detections(images[start:start + batch_size], imgsz))
+        logger.debug(f"Batched pose detection completed for {len(images)} images")
+        return detections
+
 # Example usage:
 # model = YOLOv11PoseModel('path/to/yolov11_pose.pt')
 # image = cv2.imread('path/to/image.jpg')
-# detections = model.detect_pose(image)
\ No newline at end of file
+# detections = model.detect_pose(image)
+# batch = model.detect_pose_batch([image, image])
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Build the INT8 model variant and run its accuracy check against the FP32 model
+"""
+import argparse
+import json
+import logging
+import sys
+
+from services.quantization import (
+    QUANT_CALIBRATION_DIR, QUANT_EVAL_DIR, QUANT_METHOD, QUANT_MIN_AGREEMENT,
+    quantized_artifact_paths, quantized_model_path
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="models/best.pt", help="PyTorch weights to quantize")
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference input size")
+    parser.add_argument("--method", default=QUANT_METHOD, choices=["static", "dynamic"], help="Quantization method")
+    parser.add_argument("--calibration-dir", default=QUANT_CALIBRATION_DIR, help="Images used for static calibration")
+    parser.add_argument("--eval-dir", default=QUANT_EVAL_DIR, help="Fixed image set for the accuracy check")
+    parser.add_argument("--min-agreement", type=float, default=QUANT_MIN_AGREEMENT,
+                        help="Minimum top-1 class agreement with the FP32 model")
+    parser.add_argument("--force", action="store_true", help="Re-quantize even if a cached report exists")
+    args = parser.parse_args()
+
+    _, int8_path, report_path = quantized_artifact_paths(args.model, args.imgsz, args.method)
+    if args.force and report_path.exists():
+        report_path.unlink()
+
+    selected = quantized_model_path(
+        args.model,
+        imgsz=args.imgsz,
+        method=args.method,
+        min_agreement=args.min_agreement,
+        calibration_dir=args.calibration_dir,
+        eval_dir=args.eval_dir,
+    )
+
+    print(json.dumps(json.loads(report_path.read_text()), indent=2))
+    if selected == int8_path:
+        print(f"✓ INT8 model accepted: {int8_path}")
+        return 0
+    print(f"✗ INT8 model rejected, the onnx-int8 backend will serve the FP32 model: {selected}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
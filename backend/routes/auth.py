@@ -1,20 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from pydantic import BaseModel
 import os
+import time
 
-from database import get_db
-from models.user import User
+from database import get_async_db
+from models.user import DuplicateUserError, User, pwd_context
+from services.password_hasher import PASSWORD_REHASH_ON_LOGIN, PasswordHasher, PasswordHasherBusy
+from services.ttl_cache import TTLCache
 
 # JWT Settings
 SECRET_KEY = os.getenv("SECRET_KEY", "25c965d3e8471cb391e1d396789e9f05b5015dd9a2a5dc39751c157768b093b7")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Extended token expiration time
 
+# Validated tokens are cached so authenticated requests skip the JWT decode
+# and the user lookup; a cached user is re-checked against the DB after
+# TOKEN_CACHE_TTL_SECONDS at the latest
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Build the current user from the token's signed claims, never querying the DB
+TRUST_TOKEN_CLAIMS = os.getenv("TRUST_TOKEN_CLAIMS", "0") == "1"
+
+# Largest number of users accepted by one bulk import request
+BULK_IMPORT_MAX_USERS = int(os.getenv("BULK_IMPORT_MAX_USERS", "1000"))
+# Comma-separated usernames allowed to bulk import over the API; when empty,
+# bulk imports are only possible with import_users.py
+BULK_IMPORT_ADMINS = {name.strip() for name in os.getenv("BULK_IMPORT_ADMINS", "").split(",") if name.strip()}
+
 # Token model
 class Token(BaseModel):
     access_token: str
@@ -30,6 +46,14 @@ class UserCreate(BaseModel):
     email: str
     password: str
 
+# Bulk import models
+class BulkUserImport(BaseModel):
+    users: List[UserCreate]
+
+class BulkImportResult(BaseModel):
+    created: int
+    skipped: List[dict]
+
 # User response model (without password)
 class UserResponse(BaseModel):
     id: int
@@ -45,6 +69,17 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # Create router
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+# bcrypt takes ~100+ ms of CPU per call; it runs on a bounded pool so login
+# bursts don't stall frame requests on the event loop
+password_hasher = PasswordHasher(pwd_context)
+
+def hasher_busy(e: PasswordHasherBusy):
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 # Function to create access token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -56,65 +91,138 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Token validation cache
+_claims_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+_principal_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+# When each recently changed user was last invalidated; principals cached
+# before that are stale. Older entries can expire with the principals they
+# could affect
+_user_invalidated = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+def decode_token(token: str):
+    """Decode and verify a JWT, returning its claims or None if it is invalid or expired"""
+    payload = _claims_cache.get(token)
+    if payload is not None:
+        if payload.get("exp") is None or payload["exp"] > time.time():
+            return payload
+        _claims_cache.pop(token)
+        _principal_cache.pop(token)
+        return None
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    _claims_cache.set(token, payload)
+    return payload
+
+def invalidate_user(username: str):
+    """Drop cached principals of a user after their account changed"""
+    _user_invalidated.set(username, time.monotonic())
+
+def _cached_principal(token: str, username: str):
+    entry = _principal_cache.get(token)
+    if entry is None:
+        return None
+    principal, cached_at = entry
+    invalidated_at = _user_invalidated.get(username)
+    stale = invalidated_at is not None and cached_at <= invalidated_at
+    if time.monotonic() - cached_at > TOKEN_CACHE_TTL_SECONDS or stale:
+        _principal_cache.pop(token)
+        return None
+    return principal
+
 # Function to get current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-        
-    user = User.get_by_username(db, username=token_data.username)
-    if user is None:
+    payload = decode_token(token)
+    if payload is None:
         raise credentials_exception
-        
-    return user
+    token_data = TokenData(username=payload["sub"])
+
+    principal = _cached_principal(token, token_data.username)
+    if principal is not None:
+        return principal
+
+    # Taken before the lookup, so an invalidation during it marks this principal stale
+    fetched_at = time.monotonic()
+    if TRUST_TOKEN_CLAIMS and "uid" in payload and "email" in payload:
+        principal = UserResponse(id=payload["uid"], username=token_data.username, email=payload["email"])
+    else:
+        user = await User.get_by_username_async(db, token_data.username)
+        if user is None:
+            raise credentials_exception
+        principal = UserResponse(id=user.id, username=user.username, email=user.email)
+
+    _principal_cache.set(token, (principal, fetched_at))
+    return principal
 
 # Register endpoint
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if username already exists
-    db_user = User.get_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
+async def register(user: UserCreate, db = Depends(get_async_db)):
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy as e:
+        raise hasher_busy(e)
+
+    # Create new user; duplicates are rejected by the unique indexes in the
+    # same round trip instead of being looked up first
+    try:
+        new_user = await User.create_async(
+            db,
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password
         )
-        
-    # Check if email already exists
-    db_user = User.get_by_email(db, email=user.email)
-    if db_user:
+    except DuplicateUserError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail="Email already registered" if e.field == "email" else "Username already registered"
         )
     
-    # Create new user
-    new_user = User.create(
-        db=db,
-        username=user.username,
-        email=user.email,
-        password=user.password
-    )
-    
     return new_user
 
+# Bulk import endpoint, for onboarding a whole class at once
+@router.post("/users/bulk", response_model=BulkImportResult, status_code=status.HTTP_201_CREATED)
+async def bulk_import_users(payload: BulkUserImport, db = Depends(get_async_db),
+                            current_user: UserResponse = Depends(get_current_user)):
+    if current_user.username not in BULK_IMPORT_ADMINS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Bulk import is restricted to BULK_IMPORT_ADMINS; use import_users.py otherwise"
+        )
+    if len(payload.users) > BULK_IMPORT_MAX_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_IMPORT_MAX_USERS} users per import"
+        )
+
+    try:
+        hashes = await password_hasher.hash_many([u.password for u in payload.users])
+    except PasswordHasherBusy as e:
+        raise hasher_busy(e)
+
+    users = [
+        {"username": u.username, "email": u.email, "password": hashed}
+        for u, hashed in zip(payload.users, hashes)
+    ]
+    created, skipped = await User.bulk_create_async(db, users)
+    return {"created": len(created), "skipped": skipped}
+
 # Login endpoint
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_async_db)):
     # Log the login attempt for debugging
     print(f"Login attempt for username: {form_data.username}")
     
     # Get user by username
-    user = User.get_by_username(db, username=form_data.username)
+    user = await User.get_by_username_async(db, form_data.username)
     
     if not user:
         print(f"User not found: {form_data.username}")
@@ -125,7 +233,12 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     
     # Check password
-    if not User.verify_password(form_data.password, user.password):
+    try:
+        valid, new_hash = await password_hasher.verify(form_data.password, user.password)
+    except PasswordHasherBusy as e:
+        raise hasher_busy(e)
+
+    if not valid:
         print(f"Password verification failed for user: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -133,10 +246,17 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently move the stored hash to the configured cost factor
+    if new_hash and PASSWORD_REHASH_ON_LOGIN:
+        await User.update_password_hash_async(db, user, new_hash)
+        invalidate_user(user.username)
+
     # Generate token    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # id and email are signed into the token so /me can be served from it
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id, "email": user.email},
+        expires_delta=access_token_expires
     )
     
     print(f"Login successful for user: {form_data.username}")
@@ -144,5 +264,5 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 # Get user info endpoint
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
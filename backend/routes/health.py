@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+
+from database import pool_stats
+from services.metrics import StageTimer
+from services.model_registry import MODEL_WARMUP_PASSES, registry
+
+# --- Setup ---
+router = APIRouter(prefix="/api/health", tags=["Health"])
+
+# Time spent in each startup phase, filled in by app.py
+startup_timer = StageTimer()
+
+def model_ready(status):
+    """Whether a model can serve at steady-state latency"""
+    # With warmup disabled, a loaded model is as warm as it gets
+    if MODEL_WARMUP_PASSES <= 0:
+        return status["loaded"]
+    return status["loaded"] and status["warm"]
+
+# Load time and warm state of every registered model
+@router.get("/model")
+async def model_health():
+    models = registry.health()
+    return {
+        "ready": all(model_ready(status) for status in models.values()),
+        "models": models
+    }
+
+# Connection pool utilization of the database engines
+@router.get("/db")
+async def db_health():
+    return pool_stats()
+
+# Startup timing breakdown (imports, database, model load, warmup), in seconds
+@router.get("/startup")
+async def startup_health():
+    durations = dict(startup_timer.durations)
+    durations["total"] = sum(durations.values())
+    return durations
@@ -1,169 +1,461 @@
-from fastapi import APIRouter, UploadFile, File
-from collections import defaultdict
-import cv2
-import numpy as np
-from ultralytics import YOLO
+from fastapi import APIRouter, UploadFile, File, WebSocket, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.requests import HTTPConnection
+from fastapi.responses import JSONResponse
+import asyncio
+import json
 import time
+import numpy as np
+
+from models.arithmetic_processor import ArithmeticProcessor
+from routes.auth import decode_token
+from services.frame_archiver import FrameArchiver
+from services.frame_cache import FrameCache, thumbnail
+from services.frame_decoder import BufferPool, FrameError, decode_frame
+from services.gesture_smoother import GestureSmoother
+from services.inference_executor import (
+    INFERENCE_EXECUTOR, INFERENCE_WORKERS, ProcessModelRunner, ThreadModelRunner, create_inference_executor
+)
+from services.inference_scheduler import BatchScheduler, InferenceBusy
+from services.metrics import StageTimer, metrics
+from services.model_registry import DEFAULT_MODEL, FALLBACK_MODEL, FALLBACK_MODEL_PATH, MODEL_IMGSZ, registry
+from services.qos_controller import QosController, build_tiers
+from services.roi_tracker import ROI_IMGSZ, RoiTracker
+from services.session_store import SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS, create_session_store
+from services.ttl_cache import TTLCache
 
 # --- Setup ---
 router = APIRouter()
 
-# 1. Load your trained YOLOv11 model
-# Make sure the path to your model is correct
-try:
-    model = YOLO('models/best.pt')
-    print("YOLOv11 model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-
-# 2. In-memory state management for the application
-# This dictionary will hold the state for different users (using 'default_user' for now)
+# 1. Your trained YOLOv11 model is served by the model registry, which loads
+# and warms it up on application startup (see app.py). Set MODEL_PATH to
+# point at a different weights file.
+
+# Frames from concurrent requests are coalesced into batched forward passes,
+# which run on a thread or process pool so the event loop never blocks
+def create_scheduler(model_name, workers=INFERENCE_WORKERS, share_primary=True, **options):
+    """Batch scheduler running the registered model `model_name` on its own executor.
+
+    With `share_primary` off, thread workers only use replicas, leaving the
+    loaded model to another scheduler's threads.
+    """
+    executor = create_inference_executor(model_name, workers=workers)
+    if INFERENCE_EXECUTOR == "process":
+        runner = ProcessModelRunner()
+    else:
+        def load_replica():
+            return registry.replica(model_name)
+
+        get_primary = (lambda: registry.get(model_name)) if share_primary else load_replica
+        runner = ThreadModelRunner(get_primary, load_replica)
+    return BatchScheduler(runner, executor=executor, max_concurrent_batches=workers, **options)
+
+scheduler = create_scheduler(DEFAULT_MODEL)
+schedulers = {DEFAULT_MODEL: scheduler}
+if FALLBACK_MODEL_PATH:
+    schedulers[FALLBACK_MODEL] = create_scheduler(FALLBACK_MODEL)
+
+# Under load, frames are served at a reduced input size, then by the fallback
+# weights, then with per-session frame skipping; the tier is in each response
+qos = QosController(
+    build_tiers(DEFAULT_MODEL, FALLBACK_MODEL if FALLBACK_MODEL_PATH else None),
+    lambda: scheduler.pending,
+)
+
+# Clients holding a gesture still upload near-identical frames; those reuse the
+# session's last detections instead of running inference again
+frame_cache = FrameCache()
+
+# Uncertain, class-changing and randomly sampled frames are kept for retraining;
+# they are queued here and written by a background thread
+frame_archiver = FrameArchiver()
+
+# The hand fills a small part of a webcam frame; once a session's hand has been
+# found, later frames run on a crop around it at a smaller input size
+roi_tracker = RoiTracker(imgsz=min(MODEL_IMGSZ, ROI_IMGSZ))
+
+# --- Metrics ---
+# Exposed in Prometheus format at /metrics (see routes/health.py)
+stage_latency = metrics.histogram(
+    "yolo_stage_duration_seconds", "Time spent in each frame processing stage", ("endpoint", "stage"))
+frames_processed = metrics.counter(
+    "yolo_frames_total", "Frames processed by endpoint and detected class", ("endpoint", "detected_class"))
+metrics.gauge("yolo_inference_queue_depth", "Frames waiting to join a batch", lambda: scheduler.queue_depth)
+metrics.gauge("yolo_inference_pending", "Frames admitted and not yet answered", lambda: scheduler.pending)
+metrics.gauge("yolo_frame_cache_entries", "Sessions with a cached frame", lambda: frame_cache.stats()["entries"])
+metrics.gauge("yolo_model_loaded", "Whether the default model is loaded",
+              lambda: int(registry.loaded(DEFAULT_MODEL)))
+metrics.gauge("yolo_qos_level", "Active QoS tier, 0 being full quality", lambda: qos.level)
+
+def record_frame(endpoint, timer, result):
+    """Feed a processed frame's stage durations and detected class into the metrics"""
+    for stage, seconds in timer.durations.items():
+        stage_latency.observe(seconds, endpoint, stage)
+    # /api/detect's detected_class is the smoothed gesture, 'Undefined' on most
+    # frames; count the class seen in this frame instead
+    detected = result.get("frame_class", result.get("detected_class"))
+    frames_processed.inc(endpoint, detected if detected not in (None, "Undefined") else "none")
+
+# 2. Per-session state management for the calculator
+# State is keyed by the authenticated user or a client-supplied session id and
+# kept in a pluggable store (in-process LRU, or SQLite shared across workers)
 def get_initial_state():
-    return {
-        "current_state": "WAIT_FIRST_NUM",
-        "number_1": None,
-        "operator": None,
-        "number_2": None,
-        "result": None
-    }
+    return ArithmeticProcessor().get_state()
 
-user_states = defaultdict(get_initial_state)
+session_store = create_session_store()
+# Session used by clients that send neither a token nor a session id
 USER_ID = "default_user"
 
-# 3. Map for converting class names to mathematical symbols
-OPERATOR_MAP = {
-    "tambah": "+",
-    "kurang": "-",
-    "kali": "*",
-    "bagi": "/",
-    # Also include direct symbol mappings if your model predicts them
-    "+": "+",
-    "-": "-",
-    "x": "*",
-    "/": "/"
-}
+def get_session_id(connection: HTTPConnection):
+    """Identify the calculator session of a request or WebSocket.
+
+    Uses the JWT subject when a valid bearer token is sent (header, or `token`
+    query parameter for WebSockets), then the `X-Session-ID` header or
+    `session_id` query parameter, and finally the shared default session.
+    """
+    token = None
+    authorization = connection.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    else:
+        token = connection.query_params.get("token")
+
+    if token:
+        # Validated tokens are cached, so streaming clients don't pay a decode per frame
+        payload = decode_token(token)
+        if payload is not None:
+            return f"user:{payload['sub']}"
+
+    session_id = connection.headers.get("x-session-id") or connection.query_params.get("session_id")
+    if session_id:
+        return f"session:{session_id}"
+    return USER_ID
+
+def load_state(session_id):
+    state = session_store.get(session_id)
+    return state if state is not None else get_initial_state()
+
+def save_state(session_id, state):
+    session_store.set(session_id, state)
+
+# Gestures only reach the state machine once they are held steady over several
+# frames. Each session's recent frames change on every frame, so they are kept
+# in process rather than written to the session store per frame
+gesture_smoother = GestureSmoother()
+gesture_tracks = TTLCache(SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS)
+
+def smooth_gesture(session_id, stored, prediction, confidence):
+    """Record a frame's gesture, returning (gesture to commit or 'Undefined', held gesture).
+
+    The held gesture comes from and goes back to the session's stored state
+    (`stored["gesture"]`), so workers sharing a session store commit a held
+    gesture once between them.
+    """
+    track = gesture_tracks.get(session_id) or gesture_smoother.initial_track()
+    track["committed"] = stored.get("gesture")
+    gesture = None if prediction == "Undefined" else prediction
+    committed = gesture_smoother.update(track, gesture, confidence)
+    gesture_tracks.set(session_id, track)
+    return committed or "Undefined", track["committed"]
+
+# --- Shared frame processing ---
+# Raw request bodies are read into reusable buffers instead of being spooled
+buffer_pool = BufferPool()
+# Bodies already consumed by form parsing; without a `file` part there is no frame
+FORM_CONTENT_TYPES = ("multipart/form-data", "application/x-www-form-urlencoded")
+# Content types read as a raw frame body (a missing type means octet-stream)
+RAW_CONTENT_TYPES = ("image/", "application/octet-stream")
+
+async def read_frame(request: Request, file: UploadFile = None):
+    """Read and decode a frame off the event loop, returning (image, scale).
+
+    Accepts a multipart `file` upload, or the request body itself (Content-Type
+    image/* or application/octet-stream): an encoded image, or a raw frame
+    described by the X-Frame-Format (bgr, rgb or nv12), X-Frame-Width and
+    X-Frame-Height headers. Large JPEGs are decoded directly at reduced resolution; `scale`
+    maps coordinates in the decoded image back to the uploaded frame.
+    """
+    if file is not None:
+        contents = await file.read()
+        return await run_in_threadpool(decode_frame, contents, MODEL_IMGSZ)
+
+    headers = request.headers
+    content_type = headers.get("content-type", "application/octet-stream").lower()
+    if content_type.startswith(FORM_CONTENT_TYPES):
+        raise HTTPException(status_code=422, detail="Form upload has no 'file' field")
+    if not content_type.startswith(RAW_CONTENT_TYPES):
+        raise HTTPException(status_code=415, detail=f"Unsupported frame content type: {content_type}")
+    frame_format = headers.get("x-frame-format", "jpeg").lower()
+    try:
+        width = int(headers.get("x-frame-width", 0))
+        height = int(headers.get("x-frame-height", 0))
+    except ValueError:
+        raise FrameError("Invalid frame dimensions")
+
+    buffer, view = await buffer_pool.read_stream(request.stream())
+    try:
+        return await run_in_threadpool(decode_frame, view, MODEL_IMGSZ, frame_format, width, height)
+    finally:
+        buffer_pool.release(buffer, view)
+
+async def infer_frame(img, session_id, timer, scale=1.0, tier=None):
+    """Get a decoded frame's detections, in uploaded-frame coordinates.
+
+    Frames nearly identical to the session's last inferred frame reuse its
+    detections instead of going through the scheduler, as does every frame
+    within the skip interval of a frame-skipping QoS tier. Frames of the
+    shared default session come from unrelated clients, so they are never
+    served another frame's detections.
+    """
+    tier = tier or qos.current
+    shared = session_id == USER_ID
+    with timer.stage("dedup"):
+        thumb = thumbnail(img)
+        cached = None
+        if not shared:
+            cached = frame_cache.lookup(session_id, thumb)
+            if cached is None and tier.skip_interval:
+                cached = frame_cache.recent(session_id, tier.skip_interval)
+    if cached is not None:
+        return cached
 
-# --- API Endpoint for Gesture Prediction ---
-@router.post("/api/predict")
-async def predict_gesture(file: UploadFile = File(...)):
-    if not model:
-        return {"error": "Model not loaded"}
-    
-    # Read image bytes
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
     # --- Model Inference ---
-    results = model(img)
-    
-    # Process detections
-    detections = []
-    detected_class = None
-    confidence = 0
-    
-    if results and len(results) > 0:
-        result = results[0]
-        if result.boxes is not None and len(result.boxes) > 0:
-            # Get all detections
-            for i, box in enumerate(result.boxes):
-                class_id = int(box.cls[0].item())
-                conf = box.conf[0].item()
-                class_name = result.names[class_id]
-                
-                detections.append({
-                    "class": class_name,
-                    "confidence": conf,
-                    "bbox": box.xyxy[0].tolist()
-                })
-            
-            # Get the detection with highest confidence
-            best_detection = max(detections, key=lambda x: x["confidence"])
-            detected_class = best_detection["class"]
-            confidence = best_detection["confidence"]
-    
+    started = time.perf_counter()
+    detections = await run_inference(img, session_id, timer, tier)
+    qos.observe(time.perf_counter() - started)
+    frame_archiver.consider(session_id, img, detections)
+    if scale != 1.0:
+        detections = detections.scaled(scale)
+    if not shared:
+        frame_cache.store(session_id, thumb, detections)
+    return detections
+
+async def run_inference(img, session_id, timer, tier):
+    """Run the tier's model on the session's tracked hand region, or on the full frame.
+
+    A crop that no longer contains the hand is retried on the full frame
+    straight away, so losing the track never costs a frame's result. The
+    shared default session is not tracked, as its frames come from
+    unrelated clients.
+    """
+    model_scheduler = schedulers.get(tier.model, scheduler)
+    if not registry.loaded(tier.model):
+        # Fallback weights that failed to load
+        model_scheduler = scheduler
+    imgsz = tier.imgsz or MODEL_IMGSZ
+
+    tracked = session_id != USER_ID
+    crop = roi_tracker.plan(session_id, img.shape) if tracked else None
+    detections = None
+    if crop is not None:
+        x1, y1, x2, y2 = crop
+        region = np.ascontiguousarray(img[y1:y2, x1:x2])
+        crop_imgsz = min(roi_tracker.imgsz, imgsz)
+        detections = (await model_scheduler.submit(region, timer, crop_imgsz)).offset(x1, y1)
+        if not roi_tracker.update(session_id, detections, crop):
+            detections = None
+
+    if detections is None:
+        detections = await model_scheduler.submit(img, timer, tier.imgsz)
+        if tracked:
+            roi_tracker.update(session_id, detections, None)
+    return detections
+
+async def predict_frame(img, session_id, timer=None, scale=1.0):
+    """Run inference on a decoded frame and build the prediction response"""
+    timer = timer or StageTimer()
+    tier = qos.current
+    detections = await infer_frame(img, session_id, timer, scale, tier)
+
+    with timer.stage("postprocess"):
+        result = build_prediction(detections)
+    result["qos_tier"] = tier.name
+    return result
+
+def build_prediction(detections):
+    """Build the prediction response from a frame's detections"""
+    best = detections.best()
+    if best is None:
+        return {"detected_class": None, "confidence": 0, "detections": []}
+
+    # Only the final response is materialized as Python objects
     return {
-        "detected_class": detected_class,
-        "confidence": confidence,
-        "detections": detections
+        "detected_class": detections.names[int(detections.cls[best])],
+        "confidence": float(detections.conf[best]),
+        "detections": detections.to_list()
     }
 
+async def detect_frame(img, session_id, timer=None, scale=1.0):
+    """Run inference on a decoded frame and advance the calculator state"""
+    timer = timer or StageTimer()
+    tier = qos.current
+    detections = await infer_frame(img, session_id, timer, scale, tier)
+
+    with timer.stage("postprocess"):
+        prediction, confidence = top_prediction(detections)
+    with timer.stage("state"):
+        result = advance_state(session_id, prediction, confidence)
+    # The raw per-frame class, for clients showing what is currently seen
+    result["frame_class"] = prediction
+    result["qos_tier"] = tier.name
+    return result
+
+def top_prediction(detections):
+    """Get the class and confidence of the most confident detection, or 'Undefined'"""
+    best = detections.best()
+    if best is None:
+        return "Undefined", 0.0
+    return detections.names[int(detections.cls[best])] or "Undefined", float(detections.conf[best])
+
+def advance_state(session_id, prediction, confidence):
+    """Smooth a frame's detected class and apply the committed gesture to the session's calculator"""
+    stored = load_state(session_id)
+    gesture, held = smooth_gesture(session_id, stored, prediction, confidence)
+    # 'Start' resets and 'Undefined' is ignored by the processor
+    processor = ArithmeticProcessor.from_state(stored)
+    changed = processor.process_input(gesture)
+    state = processor.get_state()
+    # Most frames change neither the calculator nor the held gesture; only
+    # those that do are written back
+    if changed or held != stored.get("gesture"):
+        save_state(session_id, {**state, "gesture": held})
+
+    # Return the committed gesture and the updated state
+    return {"detected_class": gesture, "state": state}
+
+async def handle_upload(request: Request, file: UploadFile, session_id, handle_frame):
+    """Decode an uploaded frame off the event loop and run `handle_frame` on it.
+
+    Requests are rejected with 503 when the inference queue is saturated, and
+    per-stage durations are reported in the Server-Timing header and the
+    /metrics histograms.
+    """
+    if not registry.loaded(DEFAULT_MODEL):
+        return {"error": "Model not loaded"}
+
+    timer = StageTimer()
+    try:
+        with scheduler.admit():
+            with timer.stage("decode"):
+                try:
+                    img, scale = await read_frame(request, file)
+                except FrameError as e:
+                    return {"error": str(e)}
+
+            result = await handle_frame(img, session_id, timer, scale)
+    except InferenceBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # Rendered here rather than by FastAPI so serialization is timed too
+    with timer.stage("serialize"):
+        response = JSONResponse(result)
+    response.headers["Server-Timing"] = timer.server_timing()
+    record_frame(request.url.path, timer, result)
+    return response
+
+# --- API Endpoint for Gesture Prediction ---
+@router.post("/api/predict")
+async def predict_gesture(request: Request, file: UploadFile = File(None),
+                          session_id: str = Depends(get_session_id)):
+    return await handle_upload(request, file, session_id, predict_frame)
+
 # --- API Endpoint for Calculator Detection ---
 @router.post("/api/detect")
-async def detect(file: UploadFile = File(...)):
-    if not model:
-        return {"error": "Model not loaded"}
+async def detect(request: Request, file: UploadFile = File(None),
+                 session_id: str = Depends(get_session_id)):
+    return await handle_upload(request, file, session_id, detect_frame)
 
-    # Read image bytes
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+# --- WebSocket Endpoints for Continuous Streaming ---
+async def stream_frames(websocket: WebSocket, session_id, handle_frame):
+    """Serve binary JPEG frames from a persistent connection.
 
-    # --- Model Inference ---
-    results = model(img)
-    prediction = "Undefined" # Default prediction
-    if results and len(results) > 0 and results[0].names:
-        names = results[0].names
-        for r in results:
-            for c in r.boxes.cls:
-                detected_class_name = names[int(c)]
-                # Take the first valid prediction
-                if detected_class_name:
-                    prediction = detected_class_name
+    Frames are received independently of processing and only the most recent
+    one is kept, so a client sending faster than the model can keep up gets
+    results for its latest frame instead of a growing backlog.
+    """
+    await websocket.accept()
+    if not registry.loaded(DEFAULT_MODEL):
+        await websocket.send_json({"error": "Model not loaded"})
+        await websocket.close()
+        return
+
+    latest = {"frame": None, "closed": False}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
                     break
-            if prediction != "Undefined":
+                if message.get("bytes"):
+                    # Latest frame wins; an unprocessed older frame is dropped
+                    latest["frame"] = message["bytes"]
+                    frame_ready.set()
+        finally:
+            latest["closed"] = True
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            contents, latest["frame"] = latest["frame"], None
+            if contents is None:
+                if latest["closed"]:
+                    break
+                continue
+
+            timer = StageTimer()
+            try:
+                with scheduler.admit():
+                    with timer.stage("decode"):
+                        img, scale = await run_in_threadpool(decode_frame, contents, MODEL_IMGSZ)
+                    response = await handle_frame(img, session_id, timer, scale)
+            except FrameError as e:
+                response = {"error": str(e)}
+            except InferenceBusy as e:
+                response = {"error": "Inference queue is full", "retry_after": e.retry_after}
+
+            if latest["closed"]:
                 break
+            # Same encoding as send_json, timed as its own stage
+            with timer.stage("serialize"):
+                message = json.dumps(response, separators=(",", ":"), ensure_ascii=False)
+            await websocket.send_text(message)
+            if "error" not in response:
+                record_frame(websocket.url.path, timer, response)
+    finally:
+        receiver.cancel()
 
-    # --- State Machine Logic ---
-    state = user_states[USER_ID]
-
-    # Handle 'Start' command to reset the state at any time
-    if prediction == 'Start':
-        state = user_states[USER_ID] = get_initial_state()
-        return {"detected_class": "Start", "state": state}
-
-    # Handle 'Undefined' gesture by returning current state without changes
-    if prediction == 'Undefined':
-        return {"detected_class": "Undefined", "state": state}
-
-    is_operator = prediction in OPERATOR_MAP
-    is_digit = prediction.isdigit()
-
-    # Process input based on the current state
-    if state["current_state"] == "WAIT_FIRST_NUM":
-        if is_digit:
-            state["number_1"] = int(prediction)
-            state["current_state"] = "WAIT_OPERATOR"
-
-    elif state["current_state"] == "WAIT_OPERATOR":
-        if is_operator:
-            state["operator"] = OPERATOR_MAP[prediction]
-            state["current_state"] = "WAIT_SECOND_NUM"
-        elif is_digit: # Allow user to overwrite the first number
-            state["number_1"] = int(prediction)
-
-    elif state["current_state"] == "WAIT_SECOND_NUM":
-        if is_digit:
-            state["number_2"] = int(prediction)
-            # All components are present, perform calculation
-            if all(k is not None for k in [state["number_1"], state["operator"], state["number_2"]]):
-                try:
-                    expression = f'{state["number_1"]} {state["operator"]} {state["number_2"]}'
-                    # Use a safe evaluation method in a real app
-                    state["result"] = eval(expression)
-                except (ZeroDivisionError):
-                    state["result"] = "Error"
-                except Exception:
-                    state["result"] = "Invalid"
-                state["current_state"] = "SHOWING_RESULT"
-        elif is_operator: # Allow user to overwrite the operator
-             state["operator"] = OPERATOR_MAP[prediction]
-
-    # Return the detected class and the updated state
-    return {"detected_class": prediction, "state": state}
+@router.websocket("/ws/predict")
+async def predict_gesture_stream(websocket: WebSocket, session_id: str = Depends(get_session_id)):
+    await stream_frames(websocket, session_id, predict_frame)
+
+@router.websocket("/ws/detect")
+async def detect_stream(websocket: WebSocket, session_id: str = Depends(get_session_id)):
+    await stream_frames(websocket, session_id, detect_frame)
 
 @router.post("/api/reset")
-async def reset_calculator():
-    state = user_states[USER_ID] = get_initial_state()
-    return {"message": "Calculator reset successful", "state": state}
\ No newline at end of file
+async def reset_calculator(session_id: str = Depends(get_session_id)):
+    state = get_initial_state()
+    save_state(session_id, state)
+    gesture_tracks.pop(session_id)
+    frame_cache.clear(session_id)
+    roi_tracker.clear(session_id)
+    return {"message": "Calculator reset successful", "state": state}
+
+@router.get("/api/metrics/inference")
+async def inference_metrics():
+    return {
+        **scheduler.stats(),
+        "frame_cache": frame_cache.stats(),
+        "roi": roi_tracker.stats(),
+        "qos": qos.stats(),
+        "archive": frame_archiver.stats(),
+    }
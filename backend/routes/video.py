@@ -0,0 +1,152 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import anyio
+import asyncio
+import json
+import os
+import time
+
+from routes.pose import build_prediction, create_scheduler, frames_processed
+from services.model_registry import DEFAULT_MODEL, registry
+from services.video_reader import VideoError, VideoReader, VideoSpool
+
+# --- Setup ---
+router = APIRouter()
+
+# Video settings, overridable from the environment
+VIDEO_FRAME_STRIDE = int(os.getenv("VIDEO_FRAME_STRIDE", "1"))
+VIDEO_BATCH_SIZE = int(os.getenv("VIDEO_BATCH_SIZE", "16"))
+VIDEO_MAX_CONCURRENT = int(os.getenv("VIDEO_MAX_CONCURRENT", "1"))
+VIDEO_INFERENCE_WORKERS = int(os.getenv("VIDEO_INFERENCE_WORKERS", "1"))
+
+# Videos run on their own scheduler and model replica, so grading a long
+# recording never queues ahead of live webcam frames
+video_scheduler = create_scheduler(
+    DEFAULT_MODEL,
+    workers=VIDEO_INFERENCE_WORKERS,
+    share_primary=False,
+    max_batch_size=VIDEO_BATCH_SIZE,
+    max_pending=VIDEO_BATCH_SIZE * VIDEO_MAX_CONCURRENT,
+)
+video_slots = asyncio.Semaphore(max(1, VIDEO_MAX_CONCURRENT))
+
+def ndjson(message):
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+async def spool_upload(request: Request, file: UploadFile, spool):
+    """Write a multipart upload, or the (possibly chunked) request body, to the spool file"""
+    if file is not None:
+        await run_in_threadpool(spool.copy_from, file.file)
+    else:
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+    spool.finish()
+
+async def stream_video(reader):
+    """Yield NDJSON lines: the video's properties, one line per processed frame, then a summary.
+
+    The next batch is decoded while the current one is on the model, so
+    decoding and inference overlap.
+    """
+    yield ndjson({"type": "video", **reader.info()})
+
+    started = time.perf_counter()
+    processed = 0
+    next_batch = asyncio.ensure_future(run_in_threadpool(reader.read_batch, VIDEO_BATCH_SIZE))
+    while True:
+        batch = await next_batch
+        if not batch:
+            break
+        next_batch = asyncio.ensure_future(run_in_threadpool(reader.read_batch, VIDEO_BATCH_SIZE))
+
+        # Submitted together, so the scheduler runs them as one forward pass
+        try:
+            results = await asyncio.gather(*(video_scheduler.submit(image) for _, image in batch))
+        except Exception as e:
+            yield ndjson({"type": "error", "error": str(e), "frame": batch[0][0]})
+            return
+
+        lines = []
+        for (index, _), detections in zip(batch, results):
+            prediction = build_prediction(detections)
+            frames_processed.inc("/api/predict/video", prediction["detected_class"] or "none")
+            lines.append(ndjson({"type": "frame", "frame": index, "time": reader.timestamp(index), **prediction}))
+        processed += len(batch)
+        yield "".join(lines)
+
+    elapsed = time.perf_counter() - started
+    yield ndjson({
+        "type": "summary",
+        "frames_processed": processed,
+        "seconds": elapsed,
+        "fps": processed / elapsed if elapsed else 0.0,
+    })
+
+async def release_video(reader, spool):
+    """Close the capture (after any in-flight decode), delete the upload and free the slot"""
+    await run_in_threadpool(reader.close)
+    spool.close()
+    video_slots.release()
+
+class VideoStreamResponse(StreamingResponse):
+    """NDJSON stream of a video's detections that releases the video once the response is over.
+
+    Cleanup wraps the whole response rather than living in the generator,
+    so it also runs when the client disconnects (or sending fails) before
+    the first line is produced and the generator never starts.
+    """
+
+    def __init__(self, reader, spool):
+        super().__init__(stream_video(reader), media_type="application/x-ndjson")
+        self.reader = reader
+        self.spool = spool
+        self.released = False
+
+    async def release(self):
+        if self.released:
+            return
+        self.released = True
+        try:
+            # Finish a generator left mid-stream before its reader is closed
+            await self.body_iterator.aclose()
+        finally:
+            await release_video(self.reader, self.spool)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Shielded, so cleanup also completes inside a cancelled response task
+            with anyio.CancelScope(shield=True):
+                await self.release()
+
+# --- API Endpoint for Video Files ---
+@router.post("/api/predict/video")
+async def predict_video(request: Request, file: UploadFile = File(None), stride: int = VIDEO_FRAME_STRIDE):
+    """Run the model over a recorded video and stream per-frame detections as NDJSON.
+
+    Accepts a multipart `file` upload or the video as the request body.
+    Only every `stride`-th frame is decoded and processed.
+    """
+    if not registry.loaded(DEFAULT_MODEL):
+        return {"error": "Model not loaded"}
+    if video_slots.locked():
+        raise HTTPException(status_code=503, detail="Too many videos in progress", headers={"Retry-After": "10"})
+
+    await video_slots.acquire()
+    spool = reader = None
+    try:
+        spool = VideoSpool()
+        await spool_upload(request, file, spool)
+        reader = await run_in_threadpool(VideoReader, spool.path, stride)
+    except VideoError as e:
+        return {"error": str(e)}
+    finally:
+        if reader is None:
+            # Nothing to stream; free the upload and the slot now
+            if spool is not None:
+                spool.close()
+            video_slots.release()
+
+    return VideoStreamResponse(reader, spool)
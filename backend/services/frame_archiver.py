@@ -0,0 +1,248 @@
+"""
+Sampled frame archival for retraining, written off the request path with a bounded disk quota
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Archive settings, overridable from the environment
+FRAME_ARCHIVE_ENABLED = os.getenv("FRAME_ARCHIVE_ENABLED", "1") == "1"
+FRAME_ARCHIVE_DIR = os.getenv("FRAME_ARCHIVE_DIR", "uploadedFile")
+# Frames waiting to be written; further frames are dropped, never waited for
+FRAME_ARCHIVE_QUEUE_SIZE = int(os.getenv("FRAME_ARCHIVE_QUEUE_SIZE", "64"))
+FRAME_ARCHIVE_MAX_BYTES = int(os.getenv("FRAME_ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Frames whose best detection is below this confidence are archived
+FRAME_ARCHIVE_LOW_CONFIDENCE = float(os.getenv("FRAME_ARCHIVE_LOW_CONFIDENCE", "0.5"))
+# Fraction of the remaining frames archived at random
+FRAME_ARCHIVE_SAMPLE_RATE = float(os.getenv("FRAME_ARCHIVE_SAMPLE_RATE", "0.01"))
+# At most one frame per session is archived per interval
+FRAME_ARCHIVE_MIN_INTERVAL_SECONDS = float(os.getenv("FRAME_ARCHIVE_MIN_INTERVAL_SECONDS", "1.0"))
+FRAME_ARCHIVE_JPEG_QUALITY = int(os.getenv("FRAME_ARCHIVE_JPEG_QUALITY", "90"))
+# Every worker process writes to the same directory; disk usage is re-measured
+# at least this often so the quota covers all of them
+FRAME_ARCHIVE_RESCAN_SECONDS = float(os.getenv("FRAME_ARCHIVE_RESCAN_SECONDS", "30"))
+
+# Eviction frees space down to this fraction of the quota, so it runs in bursts
+EVICTION_LOW_WATERMARK = 0.9
+DATE_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class FrameArchiver:
+    """Samples frames worth keeping and writes them on a background thread.
+
+    Frames are archived when the model is unsure (low confidence), when a
+    session's detected class changes, or at random. Each frame is stored as
+    `<dir>/<YYYY-MM-DD>/<sha256>.jpg` with its detections in a `.json` file
+    beside it; identical frames are stored once. When the archive exceeds
+    `max_bytes`, the oldest frames are deleted first. Only date directories
+    are managed, so other files in `<dir>` are never touched.
+
+    Usage is re-measured from disk every `rescan_interval` seconds and
+    before any eviction, so the quota holds across worker processes sharing
+    the directory, overshooting by at most what the others write between
+    scans.
+    """
+
+    def __init__(self, directory=FRAME_ARCHIVE_DIR, enabled=FRAME_ARCHIVE_ENABLED,
+                 queue_size=FRAME_ARCHIVE_QUEUE_SIZE, max_bytes=FRAME_ARCHIVE_MAX_BYTES,
+                 low_confidence=FRAME_ARCHIVE_LOW_CONFIDENCE, sample_rate=FRAME_ARCHIVE_SAMPLE_RATE,
+                 min_interval=FRAME_ARCHIVE_MIN_INTERVAL_SECONDS, jpeg_quality=FRAME_ARCHIVE_JPEG_QUALITY,
+                 rescan_interval=FRAME_ARCHIVE_RESCAN_SECONDS):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.low_confidence = low_confidence
+        self.sample_rate = sample_rate
+        self.min_interval = min_interval
+        self.jpeg_quality = jpeg_quality
+        self.rescan_interval = rescan_interval
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._sessions = TTLCache(10000, 3600)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Archived files oldest first as (path, size); owned by the writer thread
+        self._files = deque()
+        self._last_scan = float("-inf")
+        self.bytes_used = 0
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.errors = 0
+
+    # --- Request path: sampling and enqueueing only ---
+    def sample_reason(self, session_id, detections, now):
+        """Why this frame should be archived, or None"""
+        best = detections.best()
+        frame_class = detections.names[int(detections.cls[best])] if best is not None else None
+        state = self._sessions.get(session_id) or {"class": frame_class, "archived": float("-inf")}
+        changed = frame_class != state["class"]
+        state["class"] = frame_class
+
+        reason = None
+        if now - state["archived"] >= self.min_interval:
+            if best is not None and detections.conf[best] < self.low_confidence:
+                reason = "low_confidence"
+            elif changed:
+                reason = "class_change"
+            elif random.random() < self.sample_rate:
+                reason = "sample"
+        if reason is not None:
+            state["archived"] = now
+        self._sessions.set(session_id, state)
+        return reason
+
+    def consider(self, session_id, image, detections):
+        """Queue a frame for archival if it is sampled; never blocks"""
+        if not self.enabled:
+            return None
+        reason = self.sample_reason(session_id, detections, time.monotonic())
+        if reason is None:
+            return None
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((image, detections, reason, datetime.now(timezone.utc)))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return reason
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="frame-archiver", daemon=True)
+                self._thread.start()
+
+    # --- Writer thread ---
+    def _run(self):
+        try:
+            self._scan()
+            self._evict()
+        except OSError as e:
+            logger.error(f"Could not scan frame archive {self.directory}: {e}")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Could not archive frame: {e}")
+
+    def _scan(self):
+        """Rebuild the oldest-first file list and disk usage from what is on disk"""
+        self._last_scan = time.monotonic()
+        if not self.directory.exists():
+            return
+        entries = []
+        for day in self.directory.iterdir():
+            if not (day.is_dir() and DATE_DIR.match(day.name)):
+                continue
+            for path in day.iterdir():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    # Evicted by another worker meanwhile
+                    continue
+                entries.append((day.name, stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._files = deque((path, size) for _, _, path, size in entries)
+        self.bytes_used = sum(size for _, size in self._files)
+
+    def _write(self, image, detections, reason, captured_at):
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        data = encoded.tobytes()
+        digest = hashlib.sha256(data).hexdigest()
+        day = self.directory / captured_at.strftime("%Y-%m-%d")
+        image_path = day / f"{digest}.jpg"
+        if image_path.exists():
+            self.duplicates += 1
+            return
+
+        day.mkdir(parents=True, exist_ok=True)
+        metadata = json.dumps({
+            "sha256": digest,
+            "reason": reason,
+            "captured_at": captured_at.isoformat(),
+            "height": int(image.shape[0]),
+            "width": int(image.shape[1]),
+            "detections": detections.to_list(),
+        }).encode("utf-8")
+        # Metadata first, so an image on disk always has its detections
+        metadata_path = day / f"{digest}.json"
+        metadata_path.write_bytes(metadata)
+        image_path.write_bytes(data)
+
+        self._files.append((metadata_path, len(metadata)))
+        self._files.append((image_path, len(data)))
+        self.bytes_used += len(metadata) + len(data)
+        self.written += 1
+        if self.bytes_used > self.max_bytes or time.monotonic() - self._last_scan >= self.rescan_interval:
+            # Include what other workers wrote (or evicted) since the last scan
+            self._scan()
+        self._evict()
+
+    def _evict(self):
+        """Delete the oldest files until usage is back under the quota's low watermark"""
+        if self.bytes_used <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICTION_LOW_WATERMARK
+        while self._files and self.bytes_used > target:
+            path, size = self._files.popleft()
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.bytes_used -= size
+            if path.suffix == ".jpg":
+                self.evicted += 1
+            try:
+                path.parent.rmdir()
+            except OSError:
+                # Directory still holds newer frames
+                pass
+
+    def close(self, timeout=5.0):
+        """Write out queued frames and stop the writer thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Frame archive queue still full on shutdown, dropping queued frames")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,95 @@
+"""
+Per-session cache that reuses detections for frames nearly identical to the last inferred one
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from services.ttl_cache import TTLCache
+
+# Frame cache settings, overridable from the environment
+FRAME_CACHE_ENABLED = os.getenv("FRAME_CACHE_ENABLED", "1") == "1"
+# Mean absolute difference (0-255) between thumbnails below which frames count as the same
+FRAME_CACHE_THRESHOLD = float(os.getenv("FRAME_CACHE_THRESHOLD", "4.0"))
+# Cached detections are never reused longer than this after the inference that produced them
+FRAME_CACHE_MAX_AGE_SECONDS = float(os.getenv("FRAME_CACHE_MAX_AGE_SECONDS", "2.0"))
+FRAME_CACHE_MAX_ENTRIES = int(os.getenv("FRAME_CACHE_MAX_ENTRIES", "10000"))
+
+THUMBNAIL_SIZE = 32
+
+
+def thumbnail(image):
+    """Small grayscale copy of a frame used to compare it with earlier frames"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+    return small.astype(np.int16)
+
+
+def frame_difference(a, b):
+    """Mean absolute pixel difference between two thumbnails"""
+    return float(np.abs(a - b).mean())
+
+
+class FrameCache:
+    """Remembers each session's last inferred frame and its detections.
+
+    A new frame is compared with the frame the cached detections came from,
+    not with the previous upload, so slow drift still triggers inference.
+    """
+
+    def __init__(self, threshold=FRAME_CACHE_THRESHOLD, max_age=FRAME_CACHE_MAX_AGE_SECONDS,
+                 max_entries=FRAME_CACHE_MAX_ENTRIES, enabled=FRAME_CACHE_ENABLED):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.enabled = enabled
+        self._entries = TTLCache(max_entries, max_age)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, session_id, thumb):
+        """Get cached detections if `thumb` matches the session's last inferred frame"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(session_id)
+        hit = (
+            entry is not None
+            and time.monotonic() - entry[2] <= self.max_age
+            and entry[0].shape == thumb.shape
+            and frame_difference(entry[0], thumb) <= self.threshold
+        )
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[1] if hit else None
+
+    def recent(self, session_id, max_age):
+        """Get the session's cached detections if they are at most `max_age` seconds old, whatever the frame"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(session_id)
+        if entry is None or time.monotonic() - entry[2] > max_age:
+            return None
+        return entry[1]
+
+    def store(self, session_id, thumb, detections):
+        if self.enabled:
+            self._entries.set(session_id, (thumb, detections, time.monotonic()))
+
+    def clear(self, session_id):
+        self._entries.pop(session_id)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,164 @@
+"""
+Frame decoding: reduced-resolution JPEG decode, raw frame formats and pooled upload buffers
+"""
+import logging
+import os
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Decode settings, overridable from the environment
+DECODE_REDUCE = os.getenv("DECODE_REDUCE", "1") == "1"
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", str(16 * 1024 * 1024)))
+
+# OpenCV flags that decode JPEGs directly at 1/2, 1/4 and 1/8 resolution
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# JPEG start-of-frame markers carrying the image size
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+RAW_FORMATS = ("bgr", "rgb", "nv12")
+
+
+class FrameError(ValueError):
+    """Raised when a frame cannot be decoded"""
+
+
+def jpeg_size(data):
+    """Read (height, width) from a JPEG header without decoding, or None"""
+    view = memoryview(data)
+    if len(view) < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(view):
+        if view[i] != 0xFF:
+            return None
+        marker = view[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        length = (view[i + 2] << 8) | view[i + 3]
+        if marker in _SOF_MARKERS:
+            height = (view[i + 5] << 8) | view[i + 6]
+            width = (view[i + 7] << 8) | view[i + 8]
+            return height, width
+        i += 2 + length
+    return None
+
+
+def reduction_factor(height, width, imgsz):
+    """Largest JPEG decode reduction that keeps the frame at least `imgsz` on its long side"""
+    longest = max(height, width)
+    for factor, _ in _REDUCED_FLAGS:
+        if longest // factor >= imgsz:
+            return factor
+    return 1
+
+
+def decode_encoded(data, imgsz):
+    """Decode an encoded image, at reduced resolution when it is much larger than `imgsz`.
+
+    Returns (image, scale), where `scale` maps coordinates in the decoded
+    image back to the original frame.
+    """
+    if len(data) == 0:
+        raise FrameError("Empty frame")
+    buffer = np.frombuffer(data, np.uint8)
+    factor = 1
+    if DECODE_REDUCE and imgsz:
+        size = jpeg_size(data)
+        if size is not None:
+            factor = reduction_factor(size[0], size[1], imgsz)
+
+    flag = dict(_REDUCED_FLAGS)[factor] if factor > 1 else cv2.IMREAD_COLOR
+    try:
+        img = cv2.imdecode(buffer, flag)
+    except cv2.error as e:
+        raise FrameError(f"Invalid image: {e.err}")
+    if img is None:
+        raise FrameError("Invalid image")
+    return img, float(factor)
+
+
+def decode_raw(data, frame_format, width, height):
+    """Convert a raw BGR, RGB or NV12 frame to a BGR image.
+
+    The result never shares memory with `data`, so pooled buffers can be
+    reused as soon as this returns.
+    """
+    if frame_format not in RAW_FORMATS:
+        raise FrameError(f"Unsupported frame format: {frame_format}")
+    if not width or not height:
+        raise FrameError("Raw frames need X-Frame-Width and X-Frame-Height headers")
+
+    buffer = np.frombuffer(data, np.uint8)
+    if frame_format == "nv12":
+        expected = width * height * 3 // 2
+        if buffer.size != expected:
+            raise FrameError(f"Expected {expected} bytes for a {width}x{height} NV12 frame, got {buffer.size}")
+        return cv2.cvtColor(buffer.reshape(height * 3 // 2, width), cv2.COLOR_YUV2BGR_NV12)
+
+    expected = width * height * 3
+    if buffer.size != expected:
+        raise FrameError(f"Expected {expected} bytes for a {width}x{height} {frame_format} frame, got {buffer.size}")
+    image = buffer.reshape(height, width, 3)
+    if frame_format == "rgb":
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    return image.copy()
+
+
+def decode_frame(data, imgsz, frame_format="jpeg", width=None, height=None):
+    """Decode a frame in any supported format, returning (image, scale)"""
+    if frame_format in RAW_FORMATS:
+        return decode_raw(data, frame_format, width, height), 1.0
+    return decode_encoded(data, imgsz)
+
+
+class BufferPool:
+    """Reusable bytearrays that request bodies are read into instead of fresh bytes objects"""
+
+    def __init__(self, initial_size=256 * 1024, max_buffers=32):
+        self.initial_size = initial_size
+        self.max_buffers = max_buffers
+        self._free = []
+
+    def acquire(self):
+        return self._free.pop() if self._free else bytearray(self.initial_size)
+
+    def release(self, buffer, view=None):
+        if view is not None:
+            try:
+                view.release()
+            except BufferError:
+                # Something still references the bytes; don't reuse the buffer
+                return
+        if len(self._free) < self.max_buffers:
+            self._free.append(buffer)
+
+    async def read_stream(self, stream, max_bytes=MAX_FRAME_BYTES):
+        """Read an async byte stream into a pooled buffer.
+
+        Returns (buffer, view) where `view` is a memoryview of the bytes read.
+        Release the buffer once the view is no longer used.
+        """
+        buffer = self.acquire()
+        length = 0
+        try:
+            async for chunk in stream:
+                end = length + len(chunk)
+                if end > max_bytes:
+                    raise FrameError(f"Frame exceeds {max_bytes} bytes")
+                if end > len(buffer):
+                    # Grow geometrically; the larger buffer is kept for reuse
+                    grown = bytearray(max(end, 2 * len(buffer)))
+                    grown[:length] = buffer[:length]
+                    buffer = grown
+                buffer[length:end] = chunk
+                length = end
+        except Exception:
+            self.release(buffer)
+            raise
+        return buffer, memoryview(buffer)[:length]
@@ -0,0 +1,77 @@
+"""
+Temporal smoothing of per-frame gestures before they reach the calculator
+"""
+import os
+import time
+
+# Smoothing settings, overridable from the environment
+GESTURE_WINDOW = int(os.getenv("GESTURE_WINDOW", "5"))
+GESTURE_MIN_FRAMES = int(os.getenv("GESTURE_MIN_FRAMES", "3"))
+GESTURE_MIN_CONFIDENCE = float(os.getenv("GESTURE_MIN_CONFIDENCE", "0.5"))
+GESTURE_HOLD_SECONDS = float(os.getenv("GESTURE_HOLD_SECONDS", "0.5"))
+# Frames older than this no longer vote, so a gesture shown minutes ago can't commit
+GESTURE_MAX_AGE_SECONDS = float(os.getenv("GESTURE_MAX_AGE_SECONDS", "3.0"))
+
+
+class GestureSmoother:
+    """Confidence-weighted sliding-window vote over a session's recent frames.
+
+    A gesture is committed once it wins the vote with at least `min_frames`
+    frames and has been shown for `hold_seconds`. It is committed only once
+    while held; showing no gesture (or another one) lets it commit again.
+
+    The per-session track is a plain JSON-serializable dict, owned by the
+    caller.
+    """
+
+    def __init__(self, window=GESTURE_WINDOW, min_frames=GESTURE_MIN_FRAMES, min_confidence=GESTURE_MIN_CONFIDENCE,
+                 hold_seconds=GESTURE_HOLD_SECONDS, max_age=GESTURE_MAX_AGE_SECONDS):
+        self.window = max(1, window)
+        self.min_frames = max(1, min(min_frames, self.window))
+        self.min_confidence = min_confidence
+        self.hold_seconds = hold_seconds
+        self.max_age = max_age
+
+    @staticmethod
+    def initial_track():
+        return {"frames": [], "committed": None, "leader": None, "since": None}
+
+    def update(self, track, gesture, confidence, now=None):
+        """Add a frame's gesture to `track` and return the gesture to commit, or None.
+
+        `gesture` is None when the frame shows no gesture; detections below
+        `min_confidence` are treated the same way.
+        """
+        now = time.time() if now is None else now
+        if confidence < self.min_confidence:
+            gesture = None
+
+        frames = [f for f in track["frames"] if now - f[2] <= self.max_age]
+        frames.append([gesture, confidence, now])
+        frames = frames[-self.window:]
+        track["frames"] = frames
+
+        # Confident frames vote with their confidence, empty frames with the threshold
+        scores, counts, first_seen = {}, {}, {}
+        for name, conf, seen in frames:
+            scores[name] = scores.get(name, 0.0) + (conf if name is not None else self.min_confidence)
+            counts[name] = counts.get(name, 0) + 1
+            first_seen.setdefault(name, seen)
+        winner = max(scores, key=scores.get)
+
+        if counts[winner] < self.min_frames:
+            return None
+        if winner != track["leader"]:
+            # The hold is timed from when the gesture started winning, not from
+            # its oldest frame in the window, which at high frame rates is
+            # always younger than `hold_seconds`
+            track["leader"], track["since"] = winner, first_seen[winner]
+        if winner is None:
+            # The hand left the frame; the last gesture may be committed again
+            track["committed"] = None
+            return None
+        if winner == track["committed"] or now - track["since"] < self.hold_seconds:
+            return None
+
+        track["committed"] = winner
+        return winner
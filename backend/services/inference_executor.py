@@ -0,0 +1,142 @@
+"""
+Executor pools that run model forward passes off the event loop
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Executor settings, overridable from the environment
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# 0 keeps torch's default intra-op thread count
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+# Longest wait for every worker's model to load and warm up at startup
+INFERENCE_PREPARE_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_PREPARE_TIMEOUT_SECONDS", "300"))
+
+# Model replica owned by a process pool worker
+_worker_model = None
+
+
+def set_torch_threads(num_threads):
+    """Limit torch intra-op threads so parallel workers do not oversubscribe cores"""
+    if num_threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+        logger.info(f"Torch intra-op threads set to {num_threads}")
+    except ImportError:
+        logger.warning("torch is not installed, cannot set intra-op threads")
+
+
+class ThreadModelRunner:
+    """Batch runner giving each inference thread its own model replica.
+
+    Ultralytics predictors keep per-call state and are not safe to share
+    between threads, so only the first thread uses the already loaded model
+    (from `get_primary`) and any further threads load one with `load_replica`.
+    """
+
+    def __init__(self, get_primary, load_replica):
+        self.get_primary = get_primary
+        self.load_replica = load_replica
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._primary_claimed = False
+
+    def _model(self):
+        model = getattr(self._local, "model", None)
+        if model is None:
+            with self._lock:
+                claim_primary = not self._primary_claimed
+                self._primary_claimed = True
+            model = self.get_primary() if claim_primary else self.load_replica()
+            self._local.model = model
+        return model
+
+    def __call__(self, frames, imgsz=None):
+        return self._model().infer_detections(frames, imgsz)
+
+    def prepare(self, executor, workers, timeout=INFERENCE_PREPARE_TIMEOUT_SECONDS):
+        """Load every thread's model up front, so no live batch pays for a replica load.
+
+        A barrier holds each task until all `workers` are running, which puts
+        them on distinct executor threads. Returns the number of threads whose
+        model loaded.
+        """
+        barrier = threading.Barrier(workers, timeout=timeout)
+
+        def load():
+            barrier.wait()
+            return self._model() is not None
+
+        futures = [executor.submit(load) for _ in range(workers)]
+        ready = 0
+        for future in futures:
+            try:
+                ready += bool(future.result())
+            except Exception as e:
+                logger.error(f"Could not load an inference thread's model: {e}")
+        return ready
+
+
+def _init_process_worker(model_name, num_threads):
+    global _worker_model
+    set_torch_threads(num_threads)
+    from services.model_registry import registry
+    _worker_model = registry.replica(model_name)
+
+
+def _worker_pid():
+    # Held briefly, so a round of these tasks spreads over idle workers
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class ProcessModelRunner:
+    """Batch runner for process pool workers, each holding its own model replica"""
+
+    def __call__(self, frames, imgsz=None):
+        # Detections are plain NumPy arrays, so only they are pickled back
+        return _worker_model.infer_detections(frames, imgsz)
+
+    def prepare(self, executor, workers, timeout=INFERENCE_PREPARE_TIMEOUT_SECONDS):
+        """Start every worker process and wait until each has loaded and warmed its replica.
+
+        Workers only take tasks once their initializer has finished, so once
+        every worker has answered, all replicas are ready. Returns the number
+        of workers seen; a failing initializer raises BrokenProcessPool.
+        """
+        deadline = time.monotonic() + timeout
+        seen = set()
+        while len(seen) < workers and time.monotonic() < deadline:
+            futures = [executor.submit(_worker_pid) for _ in range(workers)]
+            seen.update(future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures)
+        return len(seen)
+
+
+def create_inference_executor(model_name, kind=INFERENCE_EXECUTOR, workers=INFERENCE_WORKERS,
+                              num_threads=TORCH_NUM_THREADS):
+    """Create the executor selected by configuration.
+
+    A thread pool runs on models loaded in this process; a process pool holds
+    one replica of the registered model `model_name` per worker process.
+    """
+    workers = max(1, workers)
+    if kind == "process":
+        logger.info(f"Using process pool inference executor with {workers} workers")
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_process_worker,
+            initargs=(model_name, num_threads),
+        )
+
+    if kind != "thread":
+        logger.warning(f"Unknown inference executor '{kind}', falling back to thread")
+    set_torch_threads(num_threads)
+    logger.info(f"Using thread pool inference executor with {workers} workers")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
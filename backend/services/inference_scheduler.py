@@ -0,0 +1,234 @@
+"""
+Dynamic micro-batching scheduler for model inference
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Batching and admission limits, overridable from the environment
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+
+
+class InferenceBusy(Exception):
+    """Raised when the scheduler is saturated and a request is not admitted"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def record_batch_stages(timings, elapsed, speed, batch_size):
+    """Split a batch's wall time into model stages on a request's StageTimer.
+
+    The request waits for the whole batch, so it is charged the batch totals.
+    Without a per-image `speed` breakdown everything counts as inference.
+    """
+    if not speed:
+        timings.record("inference", elapsed)
+        return
+    preprocess, _, nms = (seconds * batch_size for seconds in speed)
+    timings.record("preprocess", preprocess)
+    timings.record("inference", max(0.0, elapsed - preprocess - nms))
+    timings.record("nms", nms)
+
+
+class BatchScheduler:
+    """Coalesces frames from concurrent requests into batched forward passes"""
+
+    def __init__(self, runner, executor=None, max_concurrent_batches=1,
+                 max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_pending=MAX_PENDING):
+        # runner takes a list of frames and an input size (None for the model's
+        # own) and returns one result per frame; it runs on `executor` so it
+        # must be picklable for process pools
+        self.runner = runner
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+
+        # Frames that arrive while the executor is busy form the next batch
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._slots = None
+        self._queue = None
+        self._worker = None
+        self._batches = set()
+        self._pending = 0
+
+        # Metrics
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32])
+        self.wait_times = Histogram([0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0])
+        self.batch_latencies = Histogram([0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5])
+        self.batches_run = 0
+        self.frames_run = 0
+        self.rejected = 0
+
+    def prepare(self):
+        """Load and warm every worker's model before traffic arrives (blocking).
+
+        Returns the number of workers ready, or None when the runner loads
+        nothing up front.
+        """
+        prepare = getattr(self.runner, "prepare", None)
+        if prepare is None:
+            return None
+        return prepare(self.executor, self.max_concurrent_batches)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _retry_after(self):
+        # Estimate how long the current backlog takes to drain, in whole seconds
+        if self.batch_latencies.count:
+            mean_batch = self.batch_latencies.sum / self.batch_latencies.count
+            batches = self._pending / (self.max_batch_size * self.max_concurrent_batches)
+            return max(1, math.ceil(mean_batch * batches))
+        return 1
+
+    @contextmanager
+    def admit(self):
+        """Reserve a slot for a request, raising InferenceBusy when saturated"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise InferenceBusy(self._retry_after())
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    def _ensure_worker(self):
+        # The queue and worker are bound to the running event loop, so they
+        # are created on first use rather than at import time.
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, frame, timings=None, imgsz=None):
+        """Queue a frame for inference and wait for its result.
+
+        If `timings` is a StageTimer, queue wait and inference durations are
+        recorded on it. Frames with a different `imgsz` never share a batch.
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future, time.perf_counter(), timings, imgsz))
+        return await future
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+
+            # Skip frames whose requests were cancelled while queued, and run
+            # each input size as its own forward pass
+            groups = {}
+            for item in batch:
+                if not item[1].done():
+                    groups.setdefault(item[4], []).append(item)
+
+            for imgsz, group in groups.items():
+                await self._slots.acquire()
+                task = loop.create_task(self._run_batch(group, imgsz))
+                # Keep a reference so running batches are not garbage collected
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch, imgsz=None):
+        loop = asyncio.get_running_loop()
+        try:
+            started = time.perf_counter()
+            for _, _, enqueued, timings, _ in batch:
+                self.wait_times.observe(started - enqueued)
+                if timings is not None:
+                    timings.record("queue", started - enqueued)
+            self.batch_sizes.observe(len(batch))
+
+            frames = [item[0] for item in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.runner, frames, imgsz)
+                results = list(results)
+                if len(results) != len(frames):
+                    raise RuntimeError(f"Runner returned {len(results)} results for {len(frames)} frames")
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                for _, future, _, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            elapsed = time.perf_counter() - started
+            self.batch_latencies.observe(elapsed)
+            self.batches_run += 1
+            self.frames_run += len(frames)
+            for (_, future, _, timings, _), result in zip(batch, results):
+                if timings is not None:
+                    record_batch_stages(timings, elapsed, getattr(result, "speed", None), len(frames))
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Stop the worker task and release the executor"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        """Get queue depth, batch size, wait time and batch latency metrics"""
+        return {
+            "queue_depth": self.queue_depth,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_pending": self.max_pending,
+            "batches_run": self.batches_run,
+            "frames_run": self.frames_run,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_seconds": self.wait_times.snapshot(),
+            "batch_seconds": self.batch_latencies.snapshot(),
+        }
@@ -0,0 +1,226 @@
+"""
+Lightweight in-process metrics used by the inference services, with a
+Prometheus text exposition of the registered instruments
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Request and stage latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative bucket counts"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record a single observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Get (upper bound, cumulative count) pairs, ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((bound, running))
+        pairs.append((float("inf"), self.count))
+        return pairs
+
+    def snapshot(self):
+        """Get cumulative bucket counts, total count and sum"""
+        cumulative = {("+Inf" if bound == float("inf") else str(bound)): count
+                      for bound, count in self.cumulative()}
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+class StageTimer:
+    """Accumulates per-stage durations for a single request"""
+
+    def __init__(self):
+        self.durations = {}
+
+    def record(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage):
+        """Time the enclosed block as `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def server_timing(self):
+        """Format the durations as a Server-Timing header value (milliseconds)"""
+        return ", ".join(f"{stage};dur={seconds * 1000.0:.2f}" for stage, seconds in self.durations.items())
+
+
+# --- Prometheus exposition ---
+# Instruments are only updated from the event loop thread, so plain dicts and
+# integers are enough; there are no locks on the request path.
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """Gauge read from a callback when metrics are scraped, e.g. a queue's depth"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def samples(self):
+        yield self.name, self.func()
+
+
+class HistogramFamily:
+    """Histograms sharing bucket bounds, one per combination of label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}
+
+    def labels(self, *labels):
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+
+    def samples(self):
+        for labels, histogram in self.children.items():
+            for bound, count in histogram.cumulative():
+                le = (("le", _format_value(bound)),)
+                yield self.name + "_bucket" + _format_labels(self.labelnames, labels, le), count
+            yield self.name + "_sum" + _format_labels(self.labelnames, labels), histogram.sum
+            yield self.name + "_count" + _format_labels(self.labelnames, labels), histogram.count
+
+
+class MetricsRegistry:
+    """Holds the process's instruments and renders them for a Prometheus scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        """The instrument registered under `name`, or None"""
+        return self._metrics.get(name)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, func):
+        return self._register(Gauge(name, documentation, func))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Format every instrument in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {_format_value(value)}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests and timing them by route template.
+
+    Unmatched paths are grouped under one label so scanners cannot blow up
+    the number of series.
+    """
+
+    def __init__(self, app, registry):
+        self.app = app
+        # Starlette may build the middleware stack more than once; later
+        # instances reuse the instruments of the first
+        self.requests = registry.get("http_requests_total") or registry.counter(
+            "http_requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+        self.latency = registry.get("http_request_duration_seconds") or registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self.latency.observe(time.perf_counter() - start, scope["method"], path)
+            self.requests.inc(scope["method"], path, str(status["code"]))
+
+
+# Instruments registered by the routes and exposed at /metrics
+metrics = MetricsRegistry()
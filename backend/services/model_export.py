@@ -0,0 +1,76 @@
+"""
+Export of PyTorch weights to optimized CPU inference formats (ONNX, OpenVINO)
+"""
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Inference backend and export cache, overridable from the environment
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+MODEL_EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", "models/exported")
+
+# Ultralytics export format for every exportable backend
+EXPORT_FORMATS = {
+    "onnx": "onnx",
+    "openvino": "openvino",
+}
+
+
+def weights_hash(path, chunk_size=1 << 20):
+    """Short content hash of a weights file, used to key exported artifacts"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def exported_path(weights_path, backend, imgsz, export_dir=MODEL_EXPORT_DIR):
+    """Where the artifact for these weights, backend and input size is cached"""
+    stem = Path(weights_path).stem
+    name = f"{stem}-{weights_hash(weights_path)}-{imgsz}"
+    if backend == "openvino":
+        # OpenVINO models are a directory holding the IR .xml/.bin pair
+        return Path(export_dir) / f"{name}_openvino_model"
+    return Path(export_dir) / f"{name}.{backend}"
+
+
+def export_model(weights_path, backend, imgsz, export_dir=MODEL_EXPORT_DIR):
+    """Export `weights_path` for `backend` once and return the cached artifact path.
+
+    Artifacts are keyed by the weights' content hash, so replacing best.pt
+    triggers a new export while restarts reuse the existing one. The export
+    uses dynamic axes so batched and non-square frames keep working.
+    """
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported inference backend: {backend}")
+
+    target = exported_path(weights_path, backend, imgsz, export_dir)
+    if target.exists():
+        logger.info(f"Using cached {backend} export: {target}")
+        return str(target)
+
+    from ultralytics import YOLO
+
+    logger.info(f"Exporting {weights_path} to {backend} (imgsz={imgsz})")
+    exported = YOLO(weights_path).export(format=EXPORT_FORMATS[backend], imgsz=imgsz, dynamic=True)
+
+    # Ultralytics writes next to the weights; move it into the cache
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(exported), str(target))
+    logger.info(f"Exported {backend} model cached at {target}")
+    return str(target)
+
+
+def resolve_model_path(weights_path, backend=MODEL_BACKEND, imgsz=640):
+    """Get the path a model should be loaded from for the selected backend"""
+    if backend == "torch":
+        return weights_path
+    if backend == "onnx-int8":
+        from services.quantization import quantized_model_path
+        return quantized_model_path(weights_path, imgsz)
+    return export_model(weights_path, backend, imgsz)
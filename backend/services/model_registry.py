@@ -0,0 +1,156 @@
+"""
+Model registry: the single place models are loaded, warmed up and served from
+"""
+import logging
+import os
+import threading
+import time
+
+from models.yolov11_pose import YOLOv11PoseModel
+from services.model_export import MODEL_BACKEND, resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+# Model settings, overridable from the environment
+MODEL_PATH = os.getenv("MODEL_PATH", "models/best.pt")
+# Smaller weights the QoS controller switches to under heavy load (optional)
+FALLBACK_MODEL_PATH = os.getenv("FALLBACK_MODEL_PATH", "")
+MODEL_IMGSZ = int(os.getenv("MODEL_IMGSZ", "640"))
+MODEL_WARMUP_PASSES = int(os.getenv("MODEL_WARMUP_PASSES", "2"))
+# Height x width of the frames clients send, used for warmup passes
+MODEL_WARMUP_SHAPE = tuple(int(v) for v in os.getenv("MODEL_WARMUP_SHAPE", "480x640").split("x"))
+
+DEFAULT_MODEL = "default"
+FALLBACK_MODEL = "fallback"
+
+
+class ModelRegistry:
+    """Loads registered models on demand and tracks their load and warm state"""
+
+    def __init__(self):
+        self._specs = {}
+        self._models = {}
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, imgsz=MODEL_IMGSZ, backend=MODEL_BACKEND):
+        """Register a model to be loaded later under `name`.
+
+        `backend` is "torch" to run the weights directly, "onnx" / "openvino"
+        to run a cached export of them, or "onnx-int8" to run a quantized
+        export when it passes the accuracy check.
+        """
+        self._specs[name] = {"path": path, "imgsz": imgsz, "backend": backend}
+        self._status[name] = {
+            "path": path,
+            "imgsz": imgsz,
+            "backend": backend,
+            "artifact": None,
+            "loaded": False,
+            "load_seconds": None,
+            "warm": False,
+            "warmup_passes": 0,
+            "warmup_seconds": None,
+            "error": None,
+        }
+
+    def path(self, name=DEFAULT_MODEL):
+        return self._specs[name]["path"]
+
+    def create(self, name=DEFAULT_MODEL):
+        """Create a new, unregistered instance of a model (e.g. a per-worker replica)"""
+        spec = self._specs[name]
+        path = resolve_model_path(spec["path"], spec["backend"], spec["imgsz"])
+        self._status[name]["artifact"] = path
+        return YOLOv11PoseModel(path, imgsz=spec["imgsz"])
+
+    def replica(self, name=DEFAULT_MODEL):
+        """Create and warm up an extra instance of a model for another worker"""
+        model = self.create(name)
+        self.warmup_model(model)
+        return model
+
+    def load(self, name=DEFAULT_MODEL):
+        """Load a model if it is not loaded yet, returning None on failure"""
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+
+            status = self._status[name]
+            start = time.perf_counter()
+            try:
+                model = self.create(name)
+            except Exception as e:
+                logger.error(f"Error loading model '{name}': {e}")
+                status["error"] = str(e)
+                return None
+
+            status["load_seconds"] = time.perf_counter() - start
+            status["loaded"] = True
+            status["error"] = None
+            self._models[name] = model
+            logger.info(f"Model '{name}' loaded in {status['load_seconds']:.2f}s")
+            return model
+
+    @staticmethod
+    def warmup_model(model, passes=MODEL_WARMUP_PASSES, shape=MODEL_WARMUP_SHAPE):
+        """Run warmup passes at the serving resolution, returning the time taken"""
+        if passes <= 0:
+            return 0.0
+        return model.warmup(passes, shape)
+
+    def warmup(self, name=DEFAULT_MODEL, passes=MODEL_WARMUP_PASSES, shape=MODEL_WARMUP_SHAPE):
+        """Run warmup passes on a loaded model"""
+        model = self._models.get(name)
+        if model is None or passes <= 0:
+            return
+        status = self._status[name]
+        try:
+            status["warmup_seconds"] = self.warmup_model(model, passes, shape)
+            status["warmup_passes"] = passes
+            status["warm"] = True
+        except Exception as e:
+            logger.error(f"Error warming up model '{name}': {e}")
+            status["error"] = str(e)
+
+    def add(self, name, model):
+        """Serve an already constructed model under a registered name (e.g. a stub for benchmarks)"""
+        with self._lock:
+            self._models[name] = model
+        status = self._status[name]
+        status["loaded"] = True
+        status["artifact"] = type(model).__name__
+        status["error"] = None
+
+    def mark_workers_ready(self, name, workers, load_seconds):
+        """Record a model loaded and warmed only in worker processes, not in this one"""
+        status = self._status[name]
+        status["loaded"] = workers > 0
+        status["load_seconds"] = load_seconds
+        status["warm"] = workers > 0 and MODEL_WARMUP_PASSES > 0
+        status["warmup_passes"] = MODEL_WARMUP_PASSES
+        status["workers"] = workers
+        status["error"] = None if workers > 0 else "No inference worker started"
+
+    def load_all(self, warmup=True):
+        """Load (and optionally warm up) every registered model"""
+        for name in self._specs:
+            if self.load(name) is not None and warmup:
+                self.warmup(name)
+
+    def get(self, name=DEFAULT_MODEL):
+        """Get a model loaded in this process, or None if it is not loaded"""
+        return self._models.get(name)
+
+    def loaded(self, name=DEFAULT_MODEL):
+        """Whether a model can serve, in this process or in its inference workers"""
+        return name in self._status and self._status[name]["loaded"]
+
+    def health(self):
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+registry = ModelRegistry()
+registry.register(DEFAULT_MODEL, MODEL_PATH)
+if FALLBACK_MODEL_PATH:
+    registry.register(FALLBACK_MODEL, FALLBACK_MODEL_PATH)
@@ -0,0 +1,92 @@
+"""
+Password hashing and verification on a bounded thread pool, off the event loop
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Hashing pool settings, overridable from the environment
+# bcrypt releases the GIL, so threads hash in parallel without a process pool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# Threads a bulk import may occupy at once (default: half the pool), so
+# logins keep the rest
+PASSWORD_HASH_BULK_WORKERS = int(os.getenv("PASSWORD_HASH_BULK_WORKERS", "0")) or None
+PASSWORD_REHASH_ON_LOGIN = os.getenv("PASSWORD_REHASH_ON_LOGIN", "1") == "1"
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing operations are already queued"""
+
+    def __init__(self, retry_after=1):
+        super().__init__(f"Password hashing queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs a passlib CryptContext on a small dedicated pool.
+
+    At most `workers` hashes run at once, so a burst of logins uses a fixed
+    share of the CPU instead of starving frame requests, and at most
+    `max_pending` wait for a thread before new ones are turned away. Bulk
+    imports are fed to the pool `bulk_workers` hashes at a time and are not
+    counted against `max_pending`, so a large import neither queues ahead
+    of logins nor makes them fail.
+    """
+
+    def __init__(self, context, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING,
+                 bulk_workers=PASSWORD_HASH_BULK_WORKERS):
+        self.context = context
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password")
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.bulk_workers = min(self.workers, max(1, bulk_workers or self.workers // 2))
+        self._bulk_slots = asyncio.Semaphore(self.bulk_workers)
+        self._pending = 0
+        self.rejected = 0
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password):
+        return await self._run(self.context.hash, password)
+
+    async def hash_many(self, passwords):
+        """Hash several passwords on at most `bulk_workers` threads, e.g. for a bulk import"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        loop = asyncio.get_running_loop()
+
+        async def hash_one(password):
+            # Only submitted once a slot is free, so logins queue behind at most
+            # `bulk_workers` bulk hashes
+            async with self._bulk_slots:
+                return await loop.run_in_executor(self.executor, self.context.hash, password)
+
+        return await asyncio.gather(*(hash_one(p) for p in passwords))
+
+    async def verify(self, password, hashed):
+        """Check a password, returning (valid, new_hash).
+
+        `new_hash` is set when the stored hash uses a different cost factor
+        than the context is configured for, so the caller can store it.
+        """
+        try:
+            return await self._run(self.context.verify_and_update, password, hashed)
+        except PasswordHasherBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error verifying password: {e}")
+            return False, None
@@ -0,0 +1,135 @@
+"""
+Load-aware quality-of-service controller that trades accuracy for latency under pressure
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# QoS settings, overridable from the environment
+QOS_ENABLED = os.getenv("QOS_ENABLED", "1") == "1"
+# Step down a tier when the recent p95 inference latency exceeds this
+QOS_TARGET_P95_MS = float(os.getenv("QOS_TARGET_P95_MS", "150"))
+# ...or when more frames than this are admitted and waiting
+QOS_MAX_PENDING = int(os.getenv("QOS_MAX_PENDING", "16"))
+# Step back up only once p95 is below this fraction of the target
+QOS_RECOVER_RATIO = float(os.getenv("QOS_RECOVER_RATIO", "0.5"))
+# Minimum time at a degraded tier before stepping back up
+QOS_COOLDOWN_SECONDS = float(os.getenv("QOS_COOLDOWN_SECONDS", "5"))
+QOS_EVAL_INTERVAL_SECONDS = float(os.getenv("QOS_EVAL_INTERVAL_SECONDS", "1"))
+QOS_WINDOW = int(os.getenv("QOS_WINDOW", "100"))
+QOS_MIN_SAMPLES = int(os.getenv("QOS_MIN_SAMPLES", "10"))
+# Tier settings
+QOS_REDUCED_IMGSZ = int(os.getenv("QOS_REDUCED_IMGSZ", "416"))
+# In the last tier a session runs inference at most once per interval
+QOS_SKIP_INTERVAL_MS = float(os.getenv("QOS_SKIP_INTERVAL_MS", "250"))
+
+# `imgsz` None means the model's own input size; `skip_interval` is in seconds
+QosTier = namedtuple("QosTier", ("name", "model", "imgsz", "skip_interval"))
+
+
+def build_tiers(model, fallback_model=None, reduced_imgsz=QOS_REDUCED_IMGSZ,
+                skip_interval_ms=QOS_SKIP_INTERVAL_MS):
+    """Tiers from best to cheapest: full size, reduced size, fallback weights, frame skipping"""
+    tiers = [
+        QosTier("full", model, None, 0.0),
+        QosTier("reduced", model, reduced_imgsz, 0.0),
+    ]
+    if fallback_model is not None:
+        tiers.append(QosTier("fallback", fallback_model, reduced_imgsz, 0.0))
+    tiers.append(tiers[-1]._replace(name="skip", skip_interval=skip_interval_ms / 1000.0))
+    return tiers
+
+
+class QosController:
+    """Steps through tiers based on recent inference latency and queue pressure.
+
+    Escalation happens as soon as an evaluation sees pressure; stepping back
+    up needs latency well under the target and a cooldown at the current
+    tier, so the controller does not flap around a threshold.
+    """
+
+    def __init__(self, tiers, load, enabled=QOS_ENABLED, target_p95_ms=QOS_TARGET_P95_MS,
+                 max_pending=QOS_MAX_PENDING, recover_ratio=QOS_RECOVER_RATIO, cooldown=QOS_COOLDOWN_SECONDS,
+                 eval_interval=QOS_EVAL_INTERVAL_SECONDS, window=QOS_WINDOW, min_samples=QOS_MIN_SAMPLES):
+        # load returns the number of frames currently admitted
+        self.tiers = tiers
+        self.load = load
+        self.enabled = enabled
+        self.target = target_p95_ms / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.recover_ratio = recover_ratio
+        self.cooldown = cooldown
+        self.eval_interval = eval_interval
+        self.min_samples = max(1, min_samples)
+        self.level = 0
+        self._latencies = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+        self._last_eval = time.monotonic()
+        self._last_change = self._last_eval
+        self.changes = 0
+
+    @property
+    def current(self):
+        return self.tiers[self.level]
+
+    def p95(self):
+        """95th percentile of the recent latencies, in seconds (None without samples)"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def observe(self, seconds, now=None):
+        """Record one frame's inference latency and re-evaluate the tier when due"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._latencies.append(seconds)
+            if now - self._last_eval < self.eval_interval:
+                return
+            self._last_eval = now
+        self.evaluate(now)
+
+    def evaluate(self, now=None):
+        """Move at most one tier up or down based on the current pressure"""
+        if not self.enabled:
+            return
+        now = now if now is not None else time.monotonic()
+        pending = self.load()
+        with self._lock:
+            enough = len(self._latencies) >= self.min_samples
+            p95 = self.p95()
+            overloaded = pending > self.max_pending or (enough and p95 > self.target)
+            relaxed = pending <= self.max_pending // 4 and (not enough or p95 < self.target * self.recover_ratio)
+
+            level = self.level
+            if overloaded and level < len(self.tiers) - 1:
+                level += 1
+            elif relaxed and level > 0 and now - self._last_change >= self.cooldown:
+                level -= 1
+            if level == self.level:
+                return
+
+            previous, self.level = self.tiers[self.level], level
+            # Judge the new tier on its own latencies
+            self._latencies.clear()
+            self._last_change = now
+            self.changes += 1
+
+        p95_ms = f"{p95 * 1000:.0f}ms" if p95 is not None else "n/a"
+        logger.info(f"QoS tier {previous.name} -> {self.current.name} (p95 {p95_ms}, {pending} pending)")
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            "enabled": self.enabled,
+            "tier": self.current.name,
+            "level": self.level,
+            "tiers": [tier.name for tier in self.tiers],
+            "p95_ms": p95 * 1000 if p95 is not None else None,
+            "target_p95_ms": self.target * 1000,
+            "changes": self.changes,
+        }
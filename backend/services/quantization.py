@@ -0,0 +1,169 @@
+"""
+INT8 quantization of the exported ONNX model, guarded by an accuracy check
+
+Only imported when the onnx-int8 backend is selected, since it needs onnxruntime.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnxruntime
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+from services.model_export import export_model
+
+logger = logging.getLogger(__name__)
+
+# Quantization settings, overridable from the environment
+QUANT_METHOD = os.getenv("QUANT_METHOD", "static")
+QUANT_CALIBRATION_DIR = os.getenv("QUANT_CALIBRATION_DIR", "uploadedFile")
+QUANT_CALIBRATION_LIMIT = int(os.getenv("QUANT_CALIBRATION_LIMIT", "64"))
+# Images used for the accuracy check; defaults to the calibration images
+QUANT_EVAL_DIR = os.getenv("QUANT_EVAL_DIR", QUANT_CALIBRATION_DIR)
+QUANT_EVAL_LIMIT = int(os.getenv("QUANT_EVAL_LIMIT", "64"))
+# Minimum share of images where both models agree on the top-1 class
+QUANT_MIN_AGREEMENT = float(os.getenv("QUANT_MIN_AGREEMENT", "0.95"))
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def list_images(image_dir, limit):
+    """Sorted image paths from a directory, so runs use a fixed image set"""
+    directory = Path(image_dir)
+    if not directory.is_dir():
+        return []
+    paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return paths[:limit]
+
+
+def letterbox(image, imgsz):
+    """Resize keeping aspect ratio and pad to a square input tensor (NCHW, RGB, 0-1)"""
+    height, width = image.shape[:2]
+    scale = imgsz / max(height, width)
+    resized = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed sample images to ONNX Runtime static calibration"""
+
+    def __init__(self, input_name, paths, imgsz):
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._paths = iter(paths)
+
+    def get_next(self):
+        for path in self._paths:
+            image = cv2.imread(str(path))
+            if image is not None:
+                return {self.input_name: letterbox(image, self.imgsz)}
+        return None
+
+    def rewind(self):
+        pass
+
+
+def quantize_onnx(fp32_path, int8_path, method=QUANT_METHOD, calibration_dir=QUANT_CALIBRATION_DIR,
+                  calibration_limit=QUANT_CALIBRATION_LIMIT, imgsz=640):
+    """Write an INT8 copy of an ONNX model using static or dynamic quantization"""
+    if method == "dynamic":
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return
+
+    paths = list_images(calibration_dir, calibration_limit)
+    if not paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+    logger.info(f"Calibrating INT8 model on {len(paths)} images from {calibration_dir}")
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = ImageCalibrationReader(input_name, paths, imgsz)
+    quantize_static(
+        fp32_path,
+        int8_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def top1_predictions(model, paths):
+    """Top-1 (class, confidence) per image, or (None, 0.0) when nothing is detected"""
+    predictions = []
+    for path in paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        detections = model.infer_detections(image)[0]
+        best = detections.best()
+        if best is None:
+            predictions.append((None, 0.0))
+        else:
+            predictions.append((int(detections.cls[best]), float(detections.conf[best])))
+    return predictions
+
+
+def compare_models(reference, candidate, paths):
+    """Compare top-1 classes and confidences of two models on the same images"""
+    expected = top1_predictions(reference, paths)
+    actual = top1_predictions(candidate, paths)
+    agree = sum(1 for (ref_cls, _), (cand_cls, _) in zip(expected, actual) if ref_cls == cand_cls)
+    conf_deltas = [abs(ref_conf - cand_conf) for (_, ref_conf), (_, cand_conf) in zip(expected, actual)]
+    return {
+        "images": len(expected),
+        "top1_agreement": agree / len(expected) if expected else 0.0,
+        "mean_confidence_delta": float(np.mean(conf_deltas)) if conf_deltas else 0.0,
+        "max_confidence_delta": float(np.max(conf_deltas)) if conf_deltas else 0.0,
+    }
+
+
+def quantized_artifact_paths(weights_path, imgsz=640, method=QUANT_METHOD):
+    """Paths of the FP32 export, its INT8 copy and the INT8 accuracy report"""
+    fp32_path = export_model(weights_path, "onnx", imgsz)
+    int8_path = str(Path(fp32_path).with_name(f"{Path(fp32_path).stem}-int8-{method}.onnx"))
+    return fp32_path, int8_path, Path(int8_path).with_suffix(".json")
+
+
+def quantized_model_path(weights_path, imgsz=640, method=QUANT_METHOD, min_agreement=QUANT_MIN_AGREEMENT,
+                         calibration_dir=QUANT_CALIBRATION_DIR, eval_dir=QUANT_EVAL_DIR, eval_limit=QUANT_EVAL_LIMIT):
+    """Get the INT8 model path if it passes the accuracy check, else the FP32 ONNX path.
+
+    The quantized model and its accuracy report are cached next to the FP32
+    export, so the check only runs again when the weights change.
+    """
+    from models.yolov11_pose import YOLOv11PoseModel
+
+    fp32_path, int8_path, report_path = quantized_artifact_paths(weights_path, imgsz, method)
+
+    if report_path.exists():
+        report = json.loads(report_path.read_text())
+    else:
+        quantize_onnx(fp32_path, int8_path, method=method, calibration_dir=calibration_dir, imgsz=imgsz)
+        paths = list_images(eval_dir, eval_limit)
+        if not paths:
+            raise ValueError(f"No evaluation images found in {eval_dir}")
+        report = compare_models(
+            YOLOv11PoseModel(fp32_path, imgsz=imgsz),
+            YOLOv11PoseModel(int8_path, imgsz=imgsz),
+            paths,
+        )
+        report["method"] = method
+        report_path.write_text(json.dumps(report, indent=2))
+
+    logger.info(f"INT8 accuracy check: {report}")
+    if report["top1_agreement"] < min_agreement:
+        logger.warning(
+            f"INT8 model rejected: top-1 agreement {report['top1_agreement']:.3f} "
+            f"is below {min_agreement:.3f}, using the FP32 ONNX model"
+        )
+        return fp32_path
+    return int8_path
@@ -0,0 +1,114 @@
+"""
+Per-session region-of-interest tracking, so inference runs on a crop around the hand
+"""
+import os
+import threading
+
+from services.ttl_cache import TTLCache
+
+# ROI tracking settings, overridable from the environment
+ROI_TRACKING_ENABLED = os.getenv("ROI_TRACKING_ENABLED", "1") == "1"
+# Model input size for crops; smaller than MODEL_IMGSZ since the crop is small
+ROI_IMGSZ = int(os.getenv("ROI_IMGSZ", "320"))
+# The crop is the last hand box grown by this factor, to leave room for movement
+ROI_EXPAND = float(os.getenv("ROI_EXPAND", "2.0"))
+# Crops are never smaller than this many pixels a side
+ROI_MIN_SIZE = int(os.getenv("ROI_MIN_SIZE", "160"))
+# Crops covering more than this fraction of the frame run full-frame instead
+ROI_MAX_AREA = float(os.getenv("ROI_MAX_AREA", "0.5"))
+# Run a full-frame detection at least every this many frames, to catch a hand leaving the crop
+ROI_FULL_FRAME_INTERVAL = int(os.getenv("ROI_FULL_FRAME_INTERVAL", "15"))
+ROI_MIN_CONFIDENCE = float(os.getenv("ROI_MIN_CONFIDENCE", "0.25"))
+# A session's track is dropped after this long without frames
+ROI_MAX_AGE_SECONDS = float(os.getenv("ROI_MAX_AGE_SECONDS", "2.0"))
+ROI_MAX_SESSIONS = int(os.getenv("ROI_MAX_SESSIONS", "10000"))
+
+
+def expand_box(box, factor, min_size, width, height):
+    """Grow (x1, y1, x2, y2) around its center into a square crop clamped to the frame"""
+    x1, y1, x2, y2 = box
+    side = max((x2 - x1) * factor, (y2 - y1) * factor, min_size)
+    side = min(side, width, height)
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    left = int(min(max(cx - side / 2, 0), width - side))
+    top = int(min(max(cy - side / 2, 0), height - side))
+    return left, top, left + int(side), top + int(side)
+
+
+class RoiTracker:
+    """Remembers where each session's hand was last seen.
+
+    `plan` picks the crop to run the next frame on, or None for a full frame;
+    `update` feeds back that frame's detections in full-frame coordinates.
+    The track is dropped when a crop finds no hand, so the following frame
+    searches the whole image again.
+    """
+
+    def __init__(self, enabled=ROI_TRACKING_ENABLED, imgsz=ROI_IMGSZ, expand=ROI_EXPAND,
+                 min_size=ROI_MIN_SIZE, max_area=ROI_MAX_AREA, full_frame_interval=ROI_FULL_FRAME_INTERVAL,
+                 min_confidence=ROI_MIN_CONFIDENCE, max_age=ROI_MAX_AGE_SECONDS, max_sessions=ROI_MAX_SESSIONS):
+        self.enabled = enabled
+        self.imgsz = imgsz
+        self.expand = expand
+        self.min_size = min_size
+        self.max_area = max_area
+        self.full_frame_interval = max(1, full_frame_interval)
+        self.min_confidence = min_confidence
+        self._tracks = TTLCache(max_sessions, max_age)
+        self._lock = threading.Lock()
+        self.crop_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def plan(self, session_id, shape):
+        """Get the (x1, y1, x2, y2) crop for a session's next frame, or None for the full frame"""
+        crop = None
+        track = self._tracks.get(session_id) if self.enabled else None
+        if track is not None and track["since_full"] < self.full_frame_interval:
+            height, width = shape[:2]
+            candidate = expand_box(track["box"], self.expand, self.min_size, width, height)
+            area = (candidate[2] - candidate[0]) * (candidate[3] - candidate[1])
+            if area <= self.max_area * width * height:
+                crop = candidate
+
+        with self._lock:
+            if crop is None:
+                self.full_frames += 1
+            else:
+                self.crop_frames += 1
+        return crop
+
+    def update(self, session_id, detections, crop):
+        """Record a frame's detections (full-frame coordinates) from `crop`, or None for the full frame.
+
+        Returns whether a hand was found and is now tracked.
+        """
+        if not self.enabled:
+            return False
+        best = detections.best()
+        if best is None or detections.conf[best] < self.min_confidence:
+            if crop is not None:
+                with self._lock:
+                    self.lost += 1
+            self._tracks.pop(session_id)
+            return False
+
+        track = self._tracks.get(session_id)
+        since_full = 0 if crop is None or track is None else track["since_full"] + 1
+        self._tracks.set(session_id, {"box": detections.xyxy[best].tolist(), "since_full": since_full})
+        return True
+
+    def clear(self, session_id):
+        self._tracks.pop(session_id)
+
+    def stats(self):
+        total = self.crop_frames + self.full_frames
+        return {
+            "enabled": self.enabled,
+            "imgsz": self.imgsz,
+            "tracked_sessions": len(self._tracks),
+            "crop_frames": self.crop_frames,
+            "full_frames": self.full_frames,
+            "lost": self.lost,
+            "crop_rate": self.crop_frames / total if total else 0.0,
+        }
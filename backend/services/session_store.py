@@ -0,0 +1,139 @@
+"""
+Per-session calculator state storage
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Session store settings, overridable from the environment
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+
+
+class MemorySessionStore:
+    """In-process store with LRU eviction and idle expiry.
+
+    Only suitable for a single worker process; use the SQLite store when
+    several workers serve the same users.
+    """
+
+    # Idle sessions are swept once every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL_SECONDS):
+        self._cache = TTLCache(max_entries, ttl)
+        self._writes = 0
+
+    def get(self, session_id):
+        return self._cache.get(session_id)
+
+    def set(self, session_id, state):
+        self._cache.set(session_id, state)
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, session_id):
+        self._cache.pop(session_id)
+
+    def purge_expired(self):
+        return self._cache.purge_expired()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class SQLiteSessionStore:
+    """Store shared between worker processes through a local SQLite file.
+
+    Connections are opened lazily per thread and per process, so a store
+    created in a preloading gunicorn master never hands its connection to
+    the forked workers.
+    """
+
+    # Expired rows are purged once every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+        # Schema setup uses its own connection, closed before any fork
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_updated_at ON sessions (updated_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads, nor used in a
+        # child process after fork(); an inherited one is abandoned, not closed
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id, state):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), time.time()),
+        )
+        conn.commit()
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, session_id):
+        conn = self._connection()
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def purge_expired(self):
+        conn = self._connection()
+        cursor = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+        conn.commit()
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(kind=SESSION_STORE):
+    """Create the session store selected by configuration"""
+    if kind == "sqlite":
+        logger.info(f"Using SQLite session store: {SESSION_DB_PATH}")
+        return SQLiteSessionStore()
+    if kind != "memory":
+        logger.warning(f"Unknown session store '{kind}', falling back to memory")
+    return MemorySessionStore()
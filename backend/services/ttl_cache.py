@@ -0,0 +1,62 @@
+"""
+Bounded in-process cache with LRU eviction and per-entry time-to-live
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after `ttl` seconds without access"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Get a live entry and mark it as recently used"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, touched = entry
+            if now - touched > self.ttl:
+                del self._data[key]
+                return default
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store an entry, evicting the least recently used ones when full"""
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def purge_expired(self):
+        """Drop all expired entries, returning how many were removed"""
+        cutoff = time.monotonic() - self.ttl
+        removed = 0
+        with self._lock:
+            # Entries are kept in access order, so expired ones are at the front
+            while self._data:
+                key, (_, touched) = next(iter(self._data.items()))
+                if touched >= cutoff:
+                    break
+                del self._data[key]
+                removed += 1
+        return removed
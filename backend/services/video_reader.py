@@ -0,0 +1,125 @@
+"""
+Frame-by-frame video decoding for offline inference over recorded sessions
+"""
+import logging
+import os
+import tempfile
+import threading
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Video settings, overridable from the environment
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Uploads are spooled here while they are decoded (default: the system temp dir)
+VIDEO_TMP_DIR = os.getenv("VIDEO_TMP_DIR") or None
+
+SPOOL_CHUNK_SIZE = 1 << 20
+
+
+class VideoError(ValueError):
+    """Raised when a video cannot be stored or opened"""
+
+
+class VideoSpool:
+    """Temporary file an uploaded video is written to in chunks.
+
+    OpenCV can only demux from a file, so uploads are streamed to disk
+    instead of being held in memory; the file is removed on close.
+    """
+
+    def __init__(self, max_bytes=VIDEO_MAX_BYTES, directory=VIDEO_TMP_DIR):
+        self.max_bytes = max_bytes
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(prefix="video-", suffix=".upload", dir=directory)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise VideoError(f"Video exceeds {self.max_bytes} bytes")
+        self._file.write(chunk)
+
+    def copy_from(self, source):
+        """Copy a file object (e.g. an UploadFile's spooled file) in chunks"""
+        while True:
+            chunk = source.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.write(chunk)
+
+    def finish(self):
+        self._file.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class VideoReader:
+    """Decodes every `stride`-th frame of a video file, a batch at a time.
+
+    Skipped frames are only grabbed (demuxed), never decoded into images, so
+    a large stride makes decoding proportionally cheaper. `close` waits for
+    a `read_batch` running on another thread, so the capture is never
+    released mid-read.
+    """
+
+    def __init__(self, path, stride=1):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            self.capture.release()
+            raise VideoError("Could not open video")
+        self.stride = max(1, stride)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        self._index = 0
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def info(self):
+        return {
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "width": self.width,
+            "height": self.height,
+            "stride": self.stride,
+        }
+
+    def read_batch(self, size):
+        """Get up to `size` (frame index, image) pairs; an empty list at the end of the video"""
+        with self._lock:
+            return self._read_batch(size)
+
+    def _read_batch(self, size):
+        batch = []
+        while len(batch) < size and not self._finished:
+            if not self.capture.grab():
+                self._finished = True
+                break
+            index = self._index
+            self._index += 1
+            if index % self.stride:
+                continue
+            ok, image = self.capture.retrieve()
+            if not ok:
+                logger.warning(f"Could not decode video frame {index}")
+                continue
+            batch.append((index, image))
+        return batch
+
+    def timestamp(self, index):
+        """Position of a frame in seconds, or None when the frame rate is unknown"""
+        return index / self.fps if self.fps else None
+
+    def close(self):
+        with self._lock:
+            self._finished = True
+            self.capture.release()
@@ -2,6 +2,8 @@
 """
 Startup script for the FastAPI backend server
 """
+import argparse
+import importlib.util
 import os
 import sys
 import logging
@@ -34,11 +36,12 @@ def check_dependencies():
     
     missing_packages = []
     
+    # find_spec locates packages without importing them, so torch is only
+    # imported once, when the model is loaded
     for package_name, import_name in required_packages.items():
-        try:
-            __import__(import_name)
+        if importlib.util.find_spec(import_name) is not None:
             logger.info(f"✓ {package_name} is installed")
-        except ImportError:
+        else:
             missing_packages.append(package_name)
             logger.error(f"✗ {package_name} is missing")
     
@@ -51,18 +54,47 @@ def check_dependencies():
 
 def check_model_file():
     """Check if the model file exists"""
-    model_path = Path(__file__).parent / "models" / "best.pt"
+    model_path = Path(__file__).parent / os.getenv("MODEL_PATH", "models/best.pt")
     
     if not model_path.exists():
         logger.error(f"Model file not found: {model_path}")
-        logger.error("Please ensure the model file 'best.pt' is in the models/ directory")
+        logger.error("Please ensure the model file 'best.pt' is in the models/ directory, or set MODEL_PATH")
         return False
     
     logger.info(f"✓ Model file found: {model_path}")
     return True
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the FastAPI backend server")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"), help="Address to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8001")), help="Port to bind")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", "1")),
+                        help="Worker processes; more than 1 runs under gunicorn (see gunicorn_conf.py)")
+    return parser.parse_args()
+
+def run_workers(host, port, workers):
+    """Run several worker processes, replacing this process with gunicorn"""
+    os.environ["SERVER_HOST"] = host
+    os.environ["SERVER_PORT"] = str(port)
+    os.environ["SERVER_WORKERS"] = str(workers)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        # gunicorn does not run on Windows; uvicorn's own workers can't share
+        # preloaded models, so each worker loads its own copy
+        logger.warning("gunicorn is not available, using uvicorn workers without shared model memory")
+        uvicorn.run("app:app", host=host, port=port, workers=workers, log_level="info")
+        return
+
+    logger.info(f"Starting {workers} gunicorn workers on http://{host}:{port}")
+    logger.info("Send SIGHUP to the master process for a graceful restart")
+    os.chdir(Path(__file__).parent)
+    os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "app:app"])
+
 def main():
     """Main startup function"""
+    args = parse_args()
     logger.info("Starting FastAPI backend server...")
     
     # Check dependencies
@@ -81,21 +113,21 @@ def main():
     logger.info(f"✓ Upload directory ready: {upload_dir}")
     
     try:
+        if args.workers > 1:
+            run_workers(args.host, args.port, args.workers)
+            return
+
         # Import and start the FastAPI app
         from app import app
         
-        # Changed port from 8000 to 8001
-        port = 8001
-        
         logger.info("✓ FastAPI app imported successfully")
-        logger.info(f"Starting server on http://127.0.0.1:{port}")
+        logger.info(f"Starting server on http://{args.host}:{args.port}")
         logger.info("Press Ctrl+C to stop the server")
         
-        # Start the server with the modified port
         uvicorn.run(
             app,
-            host="127.0.0.1",
-            port=port,  # Changed from 8000 to 8001
+            host=args.host,
+            port=args.port,
             log_level="info",
             reload=False  # Set to True for development
         )
@@ -80,10 +80,36 @@ def test_operator_mapping():
     for indonesian, symbol in expected_mappings.items():
         print(f"✓ {indonesian} -> {symbol}")
 
+def test_processor_flow():
+    """Test the ArithmeticProcessor state engine directly (no API needed)"""
+    print("\n=== Testing Arithmetic Processor ===")
+    from models.arithmetic_processor import ArithmeticProcessor
+
+    sequences = [
+        (["5", "tambah", "3"], 8),
+        (["1", "2", "kali", "3"], 36),           # Multi-digit first number
+        (["9", "kurang", "4", "2"], -33),        # Multi-digit second number
+        (["2", "tambah", "3", "kali", "4"], 20), # Chained on the previous result
+        (["7", "bagi", "0"], "Error"),
+        (["5", "Undefined", "tambah", "Start"], None),
+    ]
+
+    for gestures, expected in sequences:
+        processor = ArithmeticProcessor()
+        for gesture in gestures:
+            processor.process_input(gesture)
+        # State survives a round trip through its serialized form
+        state = ArithmeticProcessor.from_state(processor.get_state()).get_state()
+        mark = "✓" if state["result"] == expected else "✗"
+        print(f"{mark} {' '.join(gestures)} -> {state['result']} (expected {expected})")
+        assert state["result"] == expected
+
 def main():
     """Run all tests"""
     print("Starting Arithmetic Calculator Tests...")
     
+    test_processor_flow()
+
     if not test_api_status():
         print("❌ API is not running. Please start the backend first.")
         return
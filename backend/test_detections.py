@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for array-backed detections used by postprocessing
+"""
+import numpy as np
+
+from models.yolov11_pose import Detections
+
+NAMES = {0: "1", 1: "2", 2: "tambah"}
+
+
+def make_detections():
+    """Three detections with two keypoints each"""
+    cls = np.array([0, 2, 1])
+    conf = np.array([0.4, 0.9, 0.7], dtype=np.float32)
+    xyxy = np.array([[0, 0, 10, 10], [20, 20, 40, 60], [5, 5, 15, 25]], dtype=np.float32)
+    keypoints = np.array([[[1, 1], [2, 2]], [[25, 30], [35, 50]], [[6, 6], [10, 20]]], dtype=np.float32)
+    return Detections(NAMES, cls, conf, xyxy, keypoints)
+
+def test_ranking_and_filtering():
+    """Filtering and ranking select the matching rows of every array"""
+    print("\n=== Testing Detection Ranking ===")
+    detections = make_detections()
+    assert detections.best() == 1
+
+    confident = detections.filter(0.5)
+    print(f"✓ Above 0.5: {confident.class_names()}")
+    assert confident.class_names() == ["tambah", "2"]
+    assert confident.keypoints.shape == (2, 2, 2)
+
+    top = detections.top_k(2)
+    assert top.class_names() == ["tambah", "2"]
+    assert top.conf.tolist() == sorted(detections.conf.tolist(), reverse=True)[:2]
+
+    empty = detections.filter(0.95)
+    assert len(empty) == 0 and empty.best() is None and empty.to_list() == []
+
+def test_to_list():
+    """The API response keeps the {class, confidence, bbox} shape"""
+    print("\n=== Testing Detection Serialization ===")
+    listed = make_detections().top_k(1).to_list()
+    print(f"✓ Best detection: {listed}")
+    assert listed[0]["class"] == "tambah"
+    assert abs(listed[0]["confidence"] - 0.9) < 1e-6
+    assert listed[0]["bbox"] == [20, 20, 40, 60]
+
+def test_coordinate_mapping():
+    """Crop offsets and decode scales move boxes and keypoints together"""
+    print("\n=== Testing Coordinate Mapping ===")
+    detections = make_detections()
+
+    shifted = detections.offset(100, 50)
+    assert shifted.xyxy[1].tolist() == [120, 70, 140, 110]
+    assert shifted.keypoints[1].tolist() == [[125, 80], [135, 100]]
+
+    # A frame decoded at 1/4 size maps back by multiplying by 4
+    scaled = detections.scaled(4.0)
+    print(f"✓ Scaled box: {scaled.xyxy[1].tolist()}")
+    assert scaled.xyxy[1].tolist() == [80, 80, 160, 240]
+    assert scaled.keypoints[2].tolist() == [[24, 24], [40, 80]]
+
+    # The original detections are left unchanged
+    assert detections.xyxy[1].tolist() == [20, 20, 40, 60]
+
+def main():
+    """Run all tests"""
+    print("Starting Detections Tests...")
+    test_ranking_and_filtering()
+    test_to_list()
+    test_coordinate_mapping()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for sampled frame archival and its disk quota
+"""
+import hashlib
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from models.yolov11_pose import Detections
+from services.frame_archiver import FrameArchiver
+
+NAMES = {0: "5", 1: "kali"}
+
+
+def detections(cls=0, conf=0.9):
+    return Detections(NAMES, np.array([cls]), np.array([conf], dtype=np.float32),
+                      np.array([[10, 10, 50, 50]], dtype=np.float32))
+
+def noise_frame(seed):
+    """A frame that encodes to a distinct, incompressible JPEG"""
+    return np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+def frame_digest(seed, jpeg_quality=90):
+    """Name the archiver stores a frame under"""
+    _, encoded = cv2.imencode(".jpg", noise_frame(seed), [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return hashlib.sha256(encoded.tobytes()).hexdigest()
+
+def make_archiver(directory, **overrides):
+    settings = dict(enabled=True, queue_size=1000, max_bytes=10 ** 9, low_confidence=0.5, sample_rate=1.0,
+                    min_interval=0.0, jpeg_quality=90, rescan_interval=0.0)
+    settings.update(overrides)
+    return FrameArchiver(directory, **settings)
+
+def archive_usage(directory):
+    return sum(path.stat().st_size for path in Path(directory).glob("*/*"))
+
+def archive_frames(directory, max_bytes, seeds):
+    """Worker process body: archive one frame per seed, then flush"""
+    archiver = make_archiver(directory, max_bytes=max_bytes)
+    for seed in seeds:
+        archiver.consider(f"session-{seed}", noise_frame(seed), detections())
+    archiver.close(timeout=30)
+
+def test_sampling_reasons():
+    """Unsure frames and class changes are archived; steady frames only at the sample rate"""
+    print("\n=== Testing Archive Sampling ===")
+    archiver = make_archiver("unused", sample_rate=0.0, min_interval=1.0)
+    reasons = [
+        archiver.sample_reason("a", detections(0, 0.9), now=0.0),
+        archiver.sample_reason("a", detections(0, 0.3), now=1.0),
+        archiver.sample_reason("a", detections(1, 0.9), now=2.0),
+        archiver.sample_reason("a", detections(0, 0.3), now=2.5),
+        archiver.sample_reason("a", detections(0, 0.9), now=4.0),
+    ]
+    print(f"✓ Reasons: {reasons}")
+    assert reasons == [None, "low_confidence", "class_change", None, None]
+
+def test_quota_evicts_oldest_first():
+    """Going over the quota deletes the oldest frames, and identical frames are stored once"""
+    print("\n=== Testing Archive Quota ===")
+    with tempfile.TemporaryDirectory() as directory:
+        archiver = make_archiver(directory, max_bytes=30000)
+        for seed in range(20):
+            archiver.consider("a", noise_frame(seed), detections())
+        archiver.consider("a", noise_frame(19), detections())
+        archiver.close(timeout=30)
+
+        stats = archiver.stats()
+        kept = {path.stem for path in Path(directory).glob("*/*.jpg")}
+        print(f"✓ Stats: {stats}")
+        assert stats["written"] == 20 and stats["duplicates"] == 1 and stats["evicted"] > 0
+        assert archive_usage(directory) <= 30000
+        assert stats["bytes_used"] == archive_usage(directory)
+        # The newest frames are the ones kept, each with its metadata
+        assert [frame_digest(seed) in kept for seed in range(20)] == [False] * (20 - len(kept)) + [True] * len(kept)
+        assert {path.stem for path in Path(directory).glob("*/*.json")} == kept
+
+def test_quota_holds_across_processes():
+    """Worker processes sharing one archive directory keep it under one quota together"""
+    print("\n=== Testing Archive Quota Across Processes ===")
+    max_bytes = 40000
+    with tempfile.TemporaryDirectory() as directory:
+        workers = [
+            multiprocessing.Process(target=archive_frames, args=(directory, max_bytes, range(i, 60, 3)))
+            for i in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            assert worker.exitcode == 0
+
+        usage = archive_usage(directory)
+        frames = len(list(Path(directory).glob("*/*.jpg")))
+        print(f"✓ {frames} frames kept, {usage} bytes on disk for a {max_bytes} byte quota")
+        # Each worker alone stays under the quota, so without sharing usage
+        # the directory would end up near three times over it
+        assert frames > 0
+        frame_bytes = archive_usage(directory) / frames
+        assert usage <= max_bytes + 2 * frame_bytes
+
+def main():
+    """Run all tests"""
+    print("Starting Frame Archiver Tests...")
+    test_sampling_reasons()
+    test_quota_evicts_oldest_first()
+    test_quota_holds_across_processes()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the near-duplicate frame cache
+"""
+import numpy as np
+
+import services.frame_cache as frame_cache_module
+from services.frame_cache import FrameCache, thumbnail
+
+
+def frame(brightness, square=None):
+    image = np.full((240, 320, 3), brightness, dtype=np.uint8)
+    if square is not None:
+        x, y = square
+        image[y:y + 80, x:x + 80] = 255
+    return image
+
+def test_near_duplicates_reuse_detections():
+    """A frame barely different from the last inferred one reuses its detections"""
+    print("\n=== Testing Frame Cache Hits ===")
+    cache = FrameCache(threshold=4.0, max_age=60)
+    cache.store("a", thumbnail(frame(100, (40, 40))), "detections")
+
+    assert cache.lookup("a", thumbnail(frame(101, (40, 40)))) == "detections"
+    # The hand moved, so the model has to run again
+    assert cache.lookup("a", thumbnail(frame(100, (200, 120)))) is None
+    # Sessions never see each other's detections
+    assert cache.lookup("b", thumbnail(frame(100, (40, 40)))) is None
+    stats = cache.stats()
+    print(f"✓ Stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+def test_drift_is_measured_from_the_inferred_frame():
+    """Small steps add up, since each frame is compared with the cached one, not the previous upload"""
+    print("\n=== Testing Frame Cache Drift ===")
+    cache = FrameCache(threshold=4.0, max_age=60)
+    cache.store("a", thumbnail(frame(100)), "detections")
+    hits = [cache.lookup("a", thumbnail(frame(100 + 3 * step))) for step in range(1, 4)]
+    print(f"✓ Lookups while drifting: {hits}")
+    assert hits == ["detections", None, None]
+
+def test_cached_detections_expire(monkeypatch):
+    """Detections older than max_age are never reused, however similar the frame"""
+    print("\n=== Testing Frame Cache Expiry ===")
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(frame_cache_module.time, "monotonic", lambda: clock["now"])
+    cache = FrameCache(threshold=4.0, max_age=2.0)
+    thumb = thumbnail(frame(100))
+    cache.store("a", thumb, "detections")
+
+    clock["now"] += 1.5
+    assert cache.lookup("a", thumb) == "detections"
+    assert cache.recent("a", 1.0) is None
+    clock["now"] += 1.0
+    assert cache.lookup("a", thumb) is None
+    print("✓ Expired after max_age")
+
+def test_disabled_cache():
+    """A disabled cache always runs the model"""
+    cache = FrameCache(enabled=False)
+    thumb = thumbnail(frame(100))
+    cache.store("a", thumb, "detections")
+    assert cache.lookup("a", thumb) is None
+
+def main():
+    """Run all tests"""
+    print("Starting Frame Cache Tests...")
+    test_near_duplicates_reuse_detections()
+    test_drift_is_measured_from_the_inferred_frame()
+    test_disabled_cache()
+    print("\nRun with pytest for the expiry test (it needs monkeypatch)")
+
+if __name__ == "__main__":
+    main()
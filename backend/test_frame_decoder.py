@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for reduced-resolution decoding, raw frames and pooled upload buffers
+"""
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from services.frame_decoder import (BufferPool, FrameError, decode_encoded, decode_frame, jpeg_size,
+                                    reduction_factor)
+
+
+def encode_jpeg(height, width):
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.rectangle(image, (width // 4, height // 4), (width // 2, height // 2), (255, 255, 255), -1)
+    ok, encoded = cv2.imencode(".jpg", image)
+    assert ok
+    return encoded.tobytes()
+
+def test_reduction_factor():
+    """The decode is reduced as far as possible without going below the model size"""
+    print("\n=== Testing Reduction Factor ===")
+    assert reduction_factor(2160, 3840, 640) == 4
+    assert reduction_factor(1080, 1920, 640) == 2
+    assert reduction_factor(480, 640, 640) == 1
+    assert reduction_factor(5120, 2880, 640) == 8
+    # The long side decides, whatever the orientation
+    assert reduction_factor(1920, 1080, 640) == 2
+    print("✓ 4K -> 1/4, 1080p -> 1/2, VGA -> full size")
+
+def test_jpeg_size():
+    """Frame size comes from the JPEG header without decoding"""
+    print("\n=== Testing JPEG Header Parsing ===")
+    assert jpeg_size(encode_jpeg(720, 1280)) == (720, 1280)
+    assert jpeg_size(b"not a jpeg") is None
+    assert jpeg_size(b"") is None
+
+def test_reduced_decode_scale():
+    """A reduced decode reports the scale that maps its boxes back to the original frame"""
+    print("\n=== Testing Reduced Decode ===")
+    data = encode_jpeg(1080, 1920)
+    image, scale = decode_encoded(data, 640)
+    print(f"✓ Decoded {image.shape[:2]} at scale {scale}")
+    assert image.shape[:2] == (540, 960) and scale == 2.0
+
+    # Box corners found in the reduced image land on the original square
+    rows, cols = np.nonzero(image[..., 0] > 128)
+    box = np.array([cols.min(), rows.min(), cols.max() + 1, rows.max() + 1]) * scale
+    assert np.allclose(box, [480, 270, 960, 540], atol=4)
+
+    image, scale = decode_encoded(encode_jpeg(480, 640), 640)
+    assert image.shape[:2] == (480, 640) and scale == 1.0
+
+    with pytest.raises(FrameError):
+        decode_encoded(b"", 640)
+    with pytest.raises(FrameError):
+        decode_encoded(b"garbage", 640)
+
+def test_raw_frames():
+    """Raw frames are converted to BGR and validated against their declared size"""
+    print("\n=== Testing Raw Frames ===")
+    rgb = np.zeros((4, 6, 3), dtype=np.uint8)
+    rgb[..., 0] = 255
+    image, scale = decode_frame(rgb.tobytes(), 640, "rgb", 6, 4)
+    assert scale == 1.0 and image[0, 0].tolist() == [0, 0, 255]
+
+    nv12 = np.zeros(6 * 4 * 3 // 2, dtype=np.uint8)
+    assert decode_frame(nv12.tobytes(), 640, "nv12", 6, 4)[0].shape == (4, 6, 3)
+
+    with pytest.raises(FrameError):
+        decode_frame(rgb.tobytes(), 640, "bgr", 6, 5)
+    with pytest.raises(FrameError):
+        decode_frame(rgb.tobytes(), 640, "bgr", None, None)
+    print("✓ RGB and NV12 converted, size mismatches rejected")
+
+def test_buffer_pool():
+    """Upload bodies are read into reused buffers that grow as needed"""
+    print("\n=== Testing Buffer Pool ===")
+    pool = BufferPool(initial_size=4)
+
+    async def stream(*chunks):
+        for chunk in chunks:
+            yield chunk
+
+    buffer, view = asyncio.run(pool.read_stream(stream(b"abc", b"defgh")))
+    assert bytes(view) == b"abcdefgh" and len(buffer) >= 8
+    pool.release(buffer, view)
+
+    reused, view = asyncio.run(pool.read_stream(stream(b"xy")))
+    print(f"✓ Buffer reused: {reused is buffer}")
+    assert reused is buffer and bytes(view) == b"xy"
+    pool.release(reused, view)
+
+    with pytest.raises(FrameError):
+        asyncio.run(pool.read_stream(stream(b"abc", b"def"), max_bytes=5))
+
+def main():
+    """Run all tests"""
+    print("Starting Frame Decoder Tests...")
+    test_reduction_factor()
+    test_jpeg_size()
+    test_reduced_decode_scale()
+    test_raw_frames()
+    test_buffer_pool()
+
+if __name__ == "__main__":
+    main()
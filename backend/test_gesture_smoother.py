@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for gesture smoothing and committing gestures to the calculator
+"""
+from services.gesture_smoother import GestureSmoother
+from services.ttl_cache import TTLCache
+
+
+def feed(smoother, track, gestures, start=0.0, step=0.1, confidence=0.9):
+    """Feed one gesture per frame, returning the (time, gesture) commits"""
+    commits = []
+    for i, gesture in enumerate(gestures):
+        now = start + i * step
+        committed = smoother.update(track, gesture, confidence, now=now)
+        if committed:
+            commits.append((round(now, 2), committed))
+    return commits
+
+def test_commit_timing():
+    """A gesture commits once it wins enough frames and has been held long enough"""
+    print("\n=== Testing Gesture Commit Timing ===")
+    smoother = GestureSmoother(window=5, min_frames=3, min_confidence=0.5, hold_seconds=0.5, max_age=3.0)
+
+    # First seen at 0.0s, so it commits on the first frame at least 0.5s later
+    commits = feed(smoother, smoother.initial_track(), ["5"] * 10)
+    print(f"✓ Held gesture commits: {commits}")
+    assert commits == [(0.5, "5")]
+
+    # At webcam frame rates the window spans well under the hold time
+    commits = feed(smoother, smoother.initial_track(), ["5"] * 30, step=1 / 30)
+    print(f"✓ Held gesture at 30 fps commits: {commits}")
+    assert len(commits) == 1 and 0.5 <= commits[0][0] < 0.6
+
+    # A single stray frame never wins the vote
+    commits = feed(smoother, smoother.initial_track(), ["5", "5", "kali", "5", "5", "5", "5", "5"])
+    assert commits == [(0.5, "5")]
+
+    # Lowering the hand lets the same gesture commit again
+    track = smoother.initial_track()
+    commits = feed(smoother, track, ["5"] * 8 + [None] * 5 + ["5"] * 8)
+    print(f"✓ Repeated gesture commits: {commits}")
+    assert [gesture for _, gesture in commits] == ["5", "5"]
+
+    # Detections below the confidence threshold vote as no gesture
+    assert feed(smoother, smoother.initial_track(), ["5"] * 10, confidence=0.3) == []
+
+def test_single_commit_across_workers(monkeypatch):
+    """Two workers sharing one session store commit a held gesture once"""
+    print("\n=== Testing Gesture Commits Across Workers ===")
+    import services.gesture_smoother as gesture_module
+    from routes import pose
+    from services.session_store import MemorySessionStore
+
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(gesture_module.time, "time", lambda: clock["now"])
+    monkeypatch.setattr(pose, "session_store", MemorySessionStore())
+    # Each worker process has its own in-process vote windows
+    workers = [TTLCache(100, 60), TTLCache(100, 60)]
+
+    results = []
+    for i in range(20):
+        monkeypatch.setattr(pose, "gesture_tracks", workers[i % 2])
+        results.append(pose.advance_state("session:shared", "5", 0.9))
+        clock["now"] += 0.1
+
+    commits = [r["detected_class"] for r in results if r["detected_class"] != "Undefined"]
+    number = results[-1]["state"]["number_1"]
+    print(f"✓ Commits: {commits}, number entered: {number}")
+    assert commits == ["5"]
+    assert number == 5
+
+def main():
+    """Run all tests"""
+    print("Starting Gesture Smoother Tests...")
+    test_commit_timing()
+    print("\nRun with pytest for the cross-worker test (it needs monkeypatch)")
+
+if __name__ == "__main__":
+    main()
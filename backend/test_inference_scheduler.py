@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for the micro-batching inference scheduler
+"""
+import asyncio
+import threading
+
+import pytest
+
+from services.inference_scheduler import BatchScheduler, InferenceBusy
+
+
+class RecordingRunner:
+    """Fake model runner that records each batch it is given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, frames, imgsz):
+        self.batches.append((list(frames), imgsz))
+        return [f"result-{frame}" for frame in frames]
+
+
+def test_concurrent_submits_share_a_batch():
+    """Frames submitted together run as one forward pass and each gets its own result"""
+    print("\n=== Testing Micro-Batching ===")
+    runner = RecordingRunner()
+
+    async def run():
+        scheduler = BatchScheduler(runner, max_batch_size=8, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+        finally:
+            await scheduler.close()
+
+    results = asyncio.run(run())
+    print(f"✓ Batches: {runner.batches}")
+    assert results == [f"result-{i}" for i in range(5)]
+    assert runner.batches == [([0, 1, 2, 3, 4], None)]
+
+def test_batches_are_capped():
+    """A burst larger than the batch size is split into full batches"""
+    print("\n=== Testing Batch Size Cap ===")
+    runner = RecordingRunner()
+
+    async def run():
+        scheduler = BatchScheduler(runner, max_batch_size=4, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(10)))
+        finally:
+            await scheduler.close()
+
+    results = asyncio.run(run())
+    sizes = [len(frames) for frames, _ in runner.batches]
+    print(f"✓ Batch sizes: {sizes}")
+    assert results == [f"result-{i}" for i in range(10)]
+    assert sizes == [4, 4, 2]
+
+def test_input_sizes_never_share_a_batch():
+    """Full frames and crops queued together run as separate passes at their own input size"""
+    print("\n=== Testing Batching By Input Size ===")
+    runner = RecordingRunner()
+
+    async def run():
+        scheduler = BatchScheduler(runner, max_batch_size=8, max_wait_ms=50)
+        sizes = [None, 320, None, 320, 416]
+        try:
+            return await asyncio.gather(*(scheduler.submit(i, imgsz=imgsz) for i, imgsz in enumerate(sizes)))
+        finally:
+            await scheduler.close()
+
+    results = asyncio.run(run())
+    print(f"✓ Batches: {runner.batches}")
+    assert results == [f"result-{i}" for i in range(5)]
+    assert sorted(runner.batches, key=lambda batch: batch[0]) == [([0, 2], None), ([1, 3], 320), ([4], 416)]
+
+def test_runner_errors_reach_every_request():
+    """A failed forward pass fails every request in the batch"""
+    print("\n=== Testing Batch Failure ===")
+
+    def failing_runner(frames, imgsz):
+        raise RuntimeError("CUDA out of memory")
+
+    async def run():
+        scheduler = BatchScheduler(failing_runner, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await scheduler.close()
+
+    results = asyncio.run(run())
+    print(f"✓ Results: {results}")
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_runner_runs_off_the_event_loop():
+    """Inference runs on the executor, so the event loop keeps serving requests"""
+    print("\n=== Testing Executor Offload ===")
+    threads = []
+
+    def runner(frames, imgsz):
+        threads.append(threading.current_thread().name)
+        return frames
+
+    async def run():
+        scheduler = BatchScheduler(runner, max_wait_ms=0)
+        try:
+            await scheduler.submit("frame")
+        finally:
+            await scheduler.close()
+        return threading.current_thread().name
+
+    loop_thread = asyncio.run(run())
+    print(f"✓ Runner thread: {threads[0]}, event loop thread: {loop_thread}")
+    assert threads[0].startswith("inference") and threads[0] != loop_thread
+
+def test_admission_control():
+    """Requests beyond max_pending are rejected with a retry hint instead of queued"""
+    print("\n=== Testing Admission Control ===")
+    scheduler = BatchScheduler(RecordingRunner(), max_pending=2)
+    with scheduler.admit(), scheduler.admit():
+        assert scheduler.pending == 2
+        with pytest.raises(InferenceBusy) as busy:
+            with scheduler.admit():
+                pass
+    print(f"✓ Rejected: {busy.value}")
+    assert busy.value.retry_after >= 1
+    assert scheduler.pending == 0 and scheduler.rejected == 1
+
+    # Slots freed by finished requests are admitted again
+    with scheduler.admit():
+        assert scheduler.pending == 1
+    scheduler.executor.shutdown()
+
+def main():
+    """Run all tests"""
+    print("Starting Inference Scheduler Tests...")
+    test_concurrent_submits_share_a_batch()
+    test_batches_are_capped()
+    test_input_sizes_never_share_a_batch()
+    test_runner_errors_reach_every_request()
+    test_runner_runs_off_the_event_loop()
+    test_admission_control()
+
+if __name__ == "__main__":
+    main()
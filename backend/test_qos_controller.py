@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the load-aware quality-of-service controller
+"""
+import time
+
+from services.qos_controller import QosController, build_tiers
+
+
+def make_controller(load, **overrides):
+    settings = dict(enabled=True, target_p95_ms=100, max_pending=8, recover_ratio=0.5, cooldown=5.0,
+                    eval_interval=1.0, window=50, min_samples=5)
+    settings.update(overrides)
+    return QosController(build_tiers("model", "fallback", reduced_imgsz=416, skip_interval_ms=250), load,
+                         **settings)
+
+def observe(controller, latency, start, seconds, fps=10):
+    """Report one latency per frame for `seconds`, returning the time reached"""
+    now = start
+    for _ in range(int(seconds * fps)):
+        now += 1.0 / fps
+        controller.observe(latency, now=now)
+    return now
+
+def test_tiers():
+    """Tiers go from full size down to frame skipping on the fallback model"""
+    print("\n=== Testing QoS Tiers ===")
+    tiers = build_tiers("model", "fallback", reduced_imgsz=416, skip_interval_ms=250)
+    print(f"✓ Tiers: {[tier.name for tier in tiers]}")
+    assert [tier.name for tier in tiers] == ["full", "reduced", "fallback", "skip"]
+    assert tiers[1].imgsz == 416 and tiers[2].model == "fallback" and tiers[3].skip_interval == 0.25
+    assert [tier.name for tier in build_tiers("model")] == ["full", "reduced", "skip"]
+
+def test_escalation_on_latency():
+    """Slow inference steps down one tier per evaluation, down to the last tier"""
+    print("\n=== Testing QoS Escalation ===")
+    controller = make_controller(lambda: 0)
+    now = observe(controller, 0.05, time.monotonic(), 3)
+    assert controller.current.name == "full"
+
+    levels = []
+    for _ in range(4):
+        now = observe(controller, 0.3, now, 1.05)
+        levels.append(controller.current.name)
+    print(f"✓ Tiers while slow: {levels}")
+    assert levels == ["reduced", "fallback", "skip", "skip"]
+
+def test_escalation_on_queue_pressure():
+    """A deep queue degrades even before enough latencies are collected"""
+    print("\n=== Testing QoS Queue Pressure ===")
+    controller = make_controller(lambda: 20)
+    controller.evaluate(now=time.monotonic())
+    print(f"✓ Tier with 20 pending: {controller.current.name}")
+    assert controller.current.name == "reduced"
+
+def test_recovery_with_hysteresis():
+    """Stepping back up needs latency well under target and a cooldown at each tier"""
+    print("\n=== Testing QoS Recovery ===")
+    controller = make_controller(lambda: 0)
+    now = observe(controller, 0.3, time.monotonic(), 2.05)
+    assert controller.current.name == "fallback"
+
+    # Under target but above the recovery ratio: hold the degraded tier
+    now = observe(controller, 0.08, now, 10)
+    assert controller.current.name == "fallback"
+
+    # Comfortably fast: recover once the slow frames leave the window...
+    now = observe(controller, 0.02, now, 6)
+    assert controller.current.name == "reduced"
+    # ...then wait out the cooldown before the next step up
+    now = observe(controller, 0.02, now, 3)
+    assert controller.current.name == "reduced"
+    now = observe(controller, 0.02, now, 3)
+    print(f"✓ Recovered to {controller.current.name} after {controller.changes} changes")
+    assert controller.current.name == "full"
+    assert controller.changes == 4
+
+def test_disabled_controller():
+    """A disabled controller stays at full quality however slow inference is"""
+    controller = make_controller(lambda: 100, enabled=False)
+    observe(controller, 1.0, time.monotonic(), 5)
+    assert controller.current.name == "full"
+
+def main():
+    """Run all tests"""
+    print("Starting QoS Controller Tests...")
+    test_tiers()
+    test_escalation_on_latency()
+    test_escalation_on_queue_pressure()
+    test_recovery_with_hysteresis()
+    test_disabled_controller()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for region-of-interest tracking of the hand between frames
+"""
+import numpy as np
+
+from models.yolov11_pose import Detections
+from services.roi_tracker import RoiTracker, expand_box
+
+FRAME_SHAPE = (720, 1280, 3)
+
+
+def hand(box, conf=0.9):
+    return Detections({0: "5"}, np.array([0]), np.array([conf], dtype=np.float32),
+                      np.array([box], dtype=np.float32))
+
+def no_hand():
+    return Detections({0: "5"}, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32),
+                      np.zeros((0, 4), dtype=np.float32))
+
+def make_tracker(**overrides):
+    settings = dict(enabled=True, expand=2.0, min_size=160, max_area=0.5, full_frame_interval=3,
+                    min_confidence=0.25, max_age=60)
+    settings.update(overrides)
+    return RoiTracker(**settings)
+
+def test_expand_box():
+    """Crops are squares around the hand, at least min_size, kept inside the frame"""
+    print("\n=== Testing Crop Expansion ===")
+    assert expand_box((600, 300, 700, 400), 2.0, 160, 1280, 720) == (550, 250, 750, 450)
+    # A tiny box still gets a min_size crop
+    assert expand_box((640, 360, 650, 370), 2.0, 160, 1280, 720) == (565, 285, 725, 445)
+    # A box at the edge is shifted inside rather than clipped
+    crop = expand_box((1200, 650, 1280, 720), 2.0, 160, 1280, 720)
+    print(f"✓ Edge crop: {crop}")
+    assert crop == (1120, 560, 1280, 720)
+
+def test_tracking_cycle():
+    """A found hand is cropped on later frames, with a periodic full-frame check"""
+    print("\n=== Testing Tracking Cycle ===")
+    tracker = make_tracker()
+    assert tracker.plan("a", FRAME_SHAPE) is None
+    tracker.update("a", hand((600, 300, 700, 400)), None)
+
+    plans = []
+    for _ in range(4):
+        crop = tracker.plan("a", FRAME_SHAPE)
+        plans.append(crop)
+        tracker.update("a", hand((600, 300, 700, 400)), crop)
+    print(f"✓ Plans: {plans}")
+    assert plans[:3] == [(550, 250, 750, 450)] * 3
+    assert plans[3] is None
+
+    # Other sessions are not affected by this one's track
+    assert tracker.plan("b", FRAME_SHAPE) is None
+
+def test_lost_hand_returns_to_full_frame():
+    """A crop with no hand drops the track so the next frame searches everywhere"""
+    print("\n=== Testing Lost Hand ===")
+    tracker = make_tracker()
+    tracker.update("a", hand((600, 300, 700, 400)), None)
+    crop = tracker.plan("a", FRAME_SHAPE)
+    assert crop is not None
+    assert tracker.update("a", no_hand(), crop) is False
+    assert tracker.plan("a", FRAME_SHAPE) is None
+    # Low-confidence detections do not keep a track either
+    tracker.update("a", hand((600, 300, 700, 400), conf=0.1), None)
+    assert tracker.plan("a", FRAME_SHAPE) is None
+    print(f"✓ Stats: {tracker.stats()}")
+    assert tracker.stats()["lost"] == 1
+
+def test_large_hand_runs_full_frame():
+    """A crop covering most of the frame saves nothing, so the full frame is used"""
+    tracker = make_tracker()
+    tracker.update("a", hand((200, 100, 600, 600)), None)
+    assert tracker.plan("a", FRAME_SHAPE) is None
+
+def main():
+    """Run all tests"""
+    print("Starting ROI Tracker Tests...")
+    test_expand_box()
+    test_tracking_cycle()
+    test_lost_hand_returns_to_full_frame()
+    test_large_hand_runs_full_frame()
+
+if __name__ == "__main__":
+    main()
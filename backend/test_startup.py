@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test script for fast startup: importing the app must not pull in the model stack
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_app_import_is_light(tmp_path):
+    """Importing app.py leaves torch and ultralytics unloaded and creates no tables"""
+    print("\n=== Testing App Import ===")
+    database = tmp_path / "startup.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "SESSION_STORE": "memory"}
+    env.pop("DATABASE_ASYNC_URL", None)
+    script = "import sys, app; print(','.join(m for m in ('torch', 'ultralytics') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    loaded = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    print(f"✓ Heavy modules loaded on import: {loaded or 'none'}")
+    assert loaded == ""
+    # Tables are created in the startup hook, not at import time
+    assert not database.exists() or database.stat().st_size == 0
+
+def main():
+    """Run all tests"""
+    print("Starting Startup Tests...")
+    with tempfile.TemporaryDirectory() as directory:
+        test_app_import_is_light(Path(directory))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,16 @@
 import React, { useState, useRef, useCallback, useEffect } from 'react';
+import { getSessionHeaders } from '../utils/session';
+
+// The backend keeps calculator state per logged-in user, or per tab when
+// logged out
+const getAuthHeaders = () => {
+    const token = localStorage.getItem('token');
+    return token ? { 'Authorization': `Bearer ${token}` } : getSessionHeaders();
+};
+
+// The backend commits a gesture once it is held steady over several frames,
+// so frames are sent several times a second during the 3-second window
+const ANALYSIS_INTERVAL_MS = 250;
 
 const CalculatorPage = ({ onNavigate }) => {
     const videoRef = useRef(null);
@@ -59,7 +71,10 @@ const CalculatorPage = ({ onNavigate }) => {
         }
 
         try {
-            const response = await fetch('http://localhost:8001/api/reset', { method: 'POST' });
+            const response = await fetch('http://localhost:8001/api/reset', {
+                method: 'POST',
+                headers: getAuthHeaders(),
+            });
             const data = await response.json();
 
             setAnalysisResult({
@@ -98,13 +113,11 @@ const CalculatorPage = ({ onNavigate }) => {
         
         try {
             const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg'));
-            
-            const formData = new FormData();
-            formData.append('file', blob, 'frame.jpg');
 
             const response = await fetch('http://localhost:8001/api/detect', {
                 method: 'POST',
-                body: formData,
+                headers: { 'Content-Type': 'image/jpeg', ...getAuthHeaders() },
+                body: blob,
             });
             
             return await response.json();
@@ -123,7 +136,8 @@ const CalculatorPage = ({ onNavigate }) => {
         setAnalysisTime(0);
         setStatusMessage("Analyzing gesture... (0/3s)");
         
-        let elapsedTime = 0;
+        let elapsedMs = 0;
+        let inFlight = false;
         
         // Clear previous interval if exists
         if (analysisIntervalRef.current) {
@@ -132,10 +146,11 @@ const CalculatorPage = ({ onNavigate }) => {
         
         // Start analysis process
         analysisIntervalRef.current = setInterval(async () => {
-            elapsedTime += 1;
+            elapsedMs += ANALYSIS_INTERVAL_MS;
+            const elapsedTime = Math.floor(elapsedMs / 1000);
             setAnalysisTime(elapsedTime);
             
-            if (elapsedTime >= 3) {
+            if (elapsedMs >= 3000) {
                 // Time's up - stop analysis
                 clearInterval(analysisIntervalRef.current);
                 analysisIntervalRef.current = null;
@@ -146,8 +161,11 @@ const CalculatorPage = ({ onNavigate }) => {
             
             setStatusMessage(`Analyzing gesture... (${elapsedTime}/3s)`);
             
-            // Perform analysis
+            // Perform analysis, skipping ticks while a frame is still being processed
+            if (inFlight) return;
+            inFlight = true;
             const data = await analyzeImage();
+            inFlight = false;
             if (!data) return;
             
             setAnalysisResult(data);
@@ -166,7 +184,7 @@ const CalculatorPage = ({ onNavigate }) => {
                     setStatusMessage(`Gesture detected: ${data.detected_class}`);
                 }
             }
-        }, 1000); // Run every second
+        }, ANALYSIS_INTERVAL_MS);
     }, [isAnalyzing, isCameraOn, analyzeImage, resetCalculator]);
 
     // Helper to update status message based on state
@@ -1,4 +1,5 @@
 import React, { useState, useRef, useEffect } from 'react';
+import { getSessionHeaders } from '../utils/session';
 
 const PredictGesture = ({ onNavigate }) => {
     const videoRef = useRef(null);
@@ -133,13 +134,11 @@ const PredictGesture = ({ onNavigate }) => {
         
         try {
             const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg'));
-            
-            const formData = new FormData();
-            formData.append('file', blob, 'frame.jpg');
 
             const response = await fetch('http://localhost:8001/api/predict', {
                 method: 'POST',
-                body: formData,
+                headers: { 'Content-Type': 'image/jpeg', ...getSessionHeaders() },
+                body: blob,
             });
             
             if (response.ok) {
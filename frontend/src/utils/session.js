@@ -0,0 +1,18 @@
+/**
+ * Per-tab session id sent as X-Session-ID
+ * Without it, every anonymous client shares the backend's default session
+ */
+
+const SESSION_KEY = 'sessionId';
+
+// sessionStorage is scoped to the tab, so each tab gets its own session
+export const getSessionId = () => {
+    let sessionId = sessionStorage.getItem(SESSION_KEY);
+    if (!sessionId) {
+        sessionId = crypto.randomUUID();
+        sessionStorage.setItem(SESSION_KEY, sessionId);
+    }
+    return sessionId;
+};
+
+export const getSessionHeaders = () => ({ 'X-Session-ID': getSessionId() });